@@ -0,0 +1,55 @@
+"""Seed a NASPathStorage label per entry, with create_many, and with bulk_load.
+
+Also times a streamed export of the loaded label. Run with
+``python -m benchmarks.bulk_load [count]``; the per-entry path rewrites the
+file on every create, so it is only timed on the first 1000 entries.
+"""
+import io
+import shutil
+import sys
+import tempfile
+import time
+
+from core.storage import NASPathStorage
+
+
+def records(count):
+    return ({'key': f"app{i}_prod_linux", 'value': f"/mnt/nas/app{i}/prod/linux"} for i in range(count))
+
+
+def main(count=100000):
+    cache_path = tempfile.mkdtemp()
+    try:
+        storage = NASPathStorage("bench_create", cache_path)
+        per_entry = min(count, 1000)
+        start = time.perf_counter()
+        for i in range(per_entry):
+            storage.store_path(f"app{i}", "prod", "linux", f"/mnt/nas/app{i}/prod/linux")
+        elapsed = time.perf_counter() - start
+        print(f"{'create':<12}{per_entry / elapsed:>12.0f} entries/s  ({per_entry} entries)")
+        storage.shutdown()
+
+        storage = NASPathStorage("bench_create_many", cache_path)
+        start = time.perf_counter()
+        storage.create_many({record['key']: record['value'] for record in records(count)})
+        elapsed = time.perf_counter() - start
+        print(f"{'create_many':<12}{count / elapsed:>12.0f} entries/s  ({count} entries)")
+        storage.shutdown()
+
+        storage = NASPathStorage("bench_bulk", cache_path)
+        start = time.perf_counter()
+        storage.bulk_load(records(count))
+        elapsed = time.perf_counter() - start
+        print(f"{'bulk_load':<12}{count / elapsed:>12.0f} entries/s  ({count} entries)")
+
+        start = time.perf_counter()
+        storage.export(io.BytesIO())
+        elapsed = time.perf_counter() - start
+        print(f"{'export':<12}{count / elapsed:>12.0f} entries/s  ({count} entries)")
+        storage.shutdown()
+    finally:
+        shutil.rmtree(cache_path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,46 @@
+"""Measure time to first read after opening a large label.
+
+Compares TinyDB's plain JSONStorage with the checkpointed storage used by
+Storage. Run with ``python -m benchmarks.cold_start [count]``.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from tinydb import TinyDB, Query
+from tinydb.storages import JSONStorage
+
+from core.checkpoint import CheckpointedJSONStorage
+
+
+def first_read(path, storage_class):
+    start = time.perf_counter()
+    db = TinyDB(path, storage=storage_class)
+    if storage_class is CheckpointedJSONStorage:
+        doc_id = db.storage.doc_ids_for(db.default_table_name, "key_1234")[0]
+        db.get(doc_id=doc_id)
+    else:
+        db.search(Query().key == "key_1234")
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main(count=100000):
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "bench.db")
+        db = TinyDB(path, storage=CheckpointedJSONStorage)
+        db.insert_multiple({'key': f"key_{i}", 'value': {'path': f"/mnt/nas/{i}", 'owner': 'svc'}} for i in range(count))
+        db.close()
+        print(f"{count} records, {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"plain JSONStorage:       {first_read(path, JSONStorage) * 1000:8.1f} ms")
+        print(f"CheckpointedJSONStorage: {first_read(path, CheckpointedJSONStorage) * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,56 @@
+"""Compare read/write throughput of plaintext and encrypted Storage labels.
+
+Run with ``python -m benchmarks.encryption [count]``.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from core.storage import Storage, EncryptedStorage
+from utils.crypto import CryptoManager
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def run(storage, count):
+    keys = [f"key_{i}" for i in range(count)]
+    value = {"owner": "svc", "path": "/mnt/data/" + "x" * 64}
+    results = {
+        'create': timed(lambda: [storage.create(key, value) for key in keys]),
+        'read': timed(lambda: [storage.read(key) for key in keys]),
+    }
+    storage.db.truncate()
+    results['create_many'] = timed(storage.create_many, {key: value for key in keys})
+    results['read_many'] = timed(storage.read_many, keys)
+    return results
+
+
+def main(count=500):
+    cache_path = tempfile.mkdtemp()
+    crypto = CryptoManager(key=os.urandom(32))
+    try:
+        stores = {
+            'plaintext': Storage("bench_plain", cache_path),
+            'encrypted': EncryptedStorage("bench_enc", cache_path, crypto_manager=crypto),
+            'encrypted+keys': EncryptedStorage("bench_enc_keys", cache_path, encrypt_keys=True, crypto_manager=crypto),
+        }
+        baseline = None
+        print(f"{'mode':<16}{'op':<13}{'ops/s':>12}{'overhead':>10}")
+        for name, storage in stores.items():
+            results = run(storage, count)
+            baseline = baseline or results
+            for op, elapsed in results.items():
+                print(f"{name:<16}{op:<13}{count / elapsed:>12.0f}{elapsed / baseline[op]:>9.2f}x")
+            storage.shutdown()
+    finally:
+        shutil.rmtree(cache_path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,38 @@
+"""Compare per-operation latency of the TinyDB and in-memory Storage backends.
+
+Run with ``python -m benchmarks.memory [count]``.
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from core.memory import MemoryStorage
+from core.storage import Storage
+
+
+def per_op(function, keys):
+    start = time.perf_counter()
+    for key in keys:
+        function(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def main(count=1000):
+    cache_path = tempfile.mkdtemp()
+    try:
+        stores = {'tinydb': Storage("bench_tinydb", cache_path), 'memory': MemoryStorage("bench_memory", cache_path)}
+        keys = [f"session_{i}" for i in range(count)]
+        print(f"{'backend':<10}{'create':>12}{'read':>12}{'increment':>12}  (us/op)")
+        for name, storage in stores.items():
+            create = per_op(lambda key: storage.create(key, {"user": key}, seconds=60), keys)
+            read = per_op(storage.read, keys)
+            increment = per_op(lambda key: storage.increment(f"hits_{key}"), keys)
+            print(f"{name:<10}{create:>12.1f}{read:>12.1f}{increment:>12.1f}")
+            storage.shutdown()
+    finally:
+        shutil.rmtree(cache_path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
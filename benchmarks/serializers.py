@@ -0,0 +1,80 @@
+"""Compare wire serializers for bytes and structured values.
+
+Starts a server in a child process and times create/read round trips with
+every serializer both sides support, along with the encoded payload size.
+Run with ``python -m benchmarks.serializers [count]``.
+"""
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+import Pyro5.errors
+from Pyro5.serializers import serializers as wire_serializers
+
+from core.client import available_serializers, connect
+from core.server import start_server
+
+VALUES = {
+    'bytes 1KiB': os.urandom(1024),
+    'bytes 64KiB': os.urandom(64 * 1024),
+    'dict': {"owner": "svc", "path": "/mnt/data/" + "x" * 64, "size": 4096},
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(uri, timeout=10):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            connect(uri, 'marshal')._pyroBind()
+            return
+        except Pyro5.errors.CommunicationError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def main(count=200):
+    cache_path = tempfile.mkdtemp()
+    port = free_port()
+    uri = f"PYRO:bench_serializers@localhost:{port}"
+    process = multiprocessing.Process(target=start_server, args=("bench_serializers",),
+                                      kwargs={'port': port, 'cache_path': cache_path}, daemon=True)
+    process.start()
+    try:
+        wait_for(uri)
+        print(f"{'serializer':<12}{'value':<13}{'payload':>10}{'create/s':>10}{'read/s':>10}")
+        for serializer in available_serializers():
+            proxy = connect(uri, serializer)
+            for label, value in VALUES.items():
+                payload = len(wire_serializers[serializer].dumps(value))
+                start = time.perf_counter()
+                for i in range(count):
+                    proxy.create(f"key_{i}", value)
+                created = time.perf_counter() - start
+                start = time.perf_counter()
+                for i in range(count):
+                    proxy.read(f"key_{i}")
+                read = time.perf_counter() - start
+                # Start every row from an empty file so write costs stay comparable
+                for i in range(count):
+                    proxy.delete(f"key_{i}")
+                print(f"{serializer:<12}{label:<13}{payload:>10}{count / created:>10.0f}{count / read:>10.0f}")
+            proxy._pyroRelease()
+    finally:
+        process.terminate()
+        process.join()
+        shutil.rmtree(cache_path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
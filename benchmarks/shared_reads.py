@@ -0,0 +1,60 @@
+"""Multi-process read throughput with exclusive and shared file locking.
+
+Each worker process opens the same label and reads random keys. With
+shared locks, throughput should grow close to linearly with the number of
+workers. Run with ``python -m benchmarks.shared_reads [reads_per_worker]``.
+"""
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from core.storage import Storage
+
+KEYS = 2000
+
+
+def worker(cache_path, shared_reads, reads, start_event, results):
+    storage = Storage("bench_shared", cache_path, shared_reads=shared_reads)
+    storage.read("key_0")  # Load the checkpoint before timing
+    start_event.wait()
+    start = time.perf_counter()
+    for _ in range(reads):
+        storage.read(f"key_{random.randrange(KEYS)}")
+    results.put(time.perf_counter() - start)
+
+
+def run(cache_path, shared_reads, workers, reads):
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(cache_path, shared_reads, reads, start_event, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)
+    start_event.set()
+    elapsed = max(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return workers * reads / elapsed
+
+
+def main(reads=2000):
+    cache_path = tempfile.mkdtemp()
+    try:
+        storage = Storage("bench_shared", cache_path)
+        storage.create_many({f"key_{i}": {"path": f"/mnt/nas/{i}"} for i in range(KEYS)})
+        storage.shutdown()
+        print(f"{'workers':<9}{'exclusive reads/s':>20}{'shared reads/s':>18}")
+        for workers in (1, 2, 4, 8):
+            exclusive = run(cache_path, False, workers, reads)
+            shared = run(cache_path, True, workers, reads)
+            print(f"{workers:<9}{exclusive:>20.0f}{shared:>18.0f}")
+    finally:
+        shutil.rmtree(cache_path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
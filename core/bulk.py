@@ -0,0 +1,115 @@
+"""Streaming import and export of store entries.
+
+Entries travel as ``{'key', 'value'[, 'expiration']}`` records, either as
+JSON lines (bytes values tagged as in the store file) or as a msgpack
+stream. Run ``python -m core.bulk load|export LABEL FILE`` to seed or dump
+a label, either directly on its cache path or through a server with ``--uri``.
+"""
+import argparse
+import json
+
+from core.config import logger
+from core.storage import Storage, EncryptedStorage, batches, pack_bytes, unpack_bytes
+
+try:
+    import msgpack
+except ImportError:  # Only the jsonl format is available
+    msgpack = None
+
+FORMATS = ('jsonl', 'msgpack')
+
+
+def write_records(stream, records, format: str = 'jsonl') -> int:
+    """Write records to a binary stream one at a time. Returns the number written."""
+    count = 0
+    if format == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError("The msgpack format requires the msgpack package")
+        packer = msgpack.Packer(use_bin_type=True)
+        for record in records:
+            stream.write(packer.pack(record))
+            count += 1
+    else:
+        for record in records:
+            stream.write(json.dumps({**record, 'value': pack_bytes(record['value'])}).encode() + b'\n')
+            count += 1
+    return count
+
+
+def read_records(stream, format: str = 'jsonl'):
+    """Yield records from a binary stream without reading it all into memory."""
+    if format == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError("The msgpack format requires the msgpack package")
+        yield from msgpack.Unpacker(stream, raw=False)
+        return
+    for line in stream:
+        if line.strip():
+            record = json.loads(line)
+            record['value'] = unpack_bytes(record['value'])
+            yield record
+
+
+def _open_store(args):
+    if args.encrypted:
+        return EncryptedStorage(args.label, args.cache_path, encrypt_keys=args.encrypt_keys)
+    return Storage(args.label, args.cache_path)
+
+
+def load(args, stream) -> int:
+    records = read_records(stream, args.format)
+    if not args.uri:
+        store = _open_store(args)
+        try:
+            return store.bulk_load(records, seconds=args.seconds, replace=args.replace, batch_size=args.batch_size)
+        finally:
+            store.shutdown()
+    from core.client import connect
+    proxy = connect(args.uri)
+    # Batches are staged on the server, which writes the file once on commit
+    load_id = proxy.bulk_load_begin(args.seconds, args.replace)
+    try:
+        for batch in batches(records, args.batch_size):
+            proxy.bulk_load_append(load_id, batch)
+    except BaseException:
+        proxy.bulk_load_abort(load_id)
+        raise
+    return proxy.bulk_load_commit(load_id)
+
+
+def export(args, stream) -> int:
+    if not args.uri:
+        store = _open_store(args)
+        try:
+            return store.export(stream, args.format, batch_size=args.batch_size)
+        finally:
+            store.shutdown()
+    from core.client import connect
+    proxy = connect(args.uri)
+    # The server streams the records, so the client never holds more than one batch
+    return write_records(stream, proxy.export(args.batch_size), args.format)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m core.bulk', description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=('load', 'export'))
+    parser.add_argument('label')
+    parser.add_argument('file', help="Path to read from or write to")
+    parser.add_argument('--cache-path', default='cache')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('--uri', help="Go through a running server instead of opening the store file")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seconds', type=int, help="Expire loaded entries after this many seconds")
+    parser.add_argument('--replace', action='store_true', help="Empty the store before loading")
+    parser.add_argument('--encrypted', action='store_true')
+    parser.add_argument('--encrypt-keys', action='store_true')
+    args = parser.parse_args(argv)
+
+    with open(args.file, 'rb' if args.command == 'load' else 'wb') as stream:
+        count = load(args, stream) if args.command == 'load' else export(args, stream)
+    logger.info(f"{args.command.capitalize()}ed {count} entries for {args.label}")
+    return count
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+from collections.abc import Mapping
+
+from tinydb.storages import Storage as TinyStorage, touch
+
+
+class LazyTable(Mapping):
+    """Read-only view of a TinyDB table whose documents are parsed on access.
+
+    Each document is kept as its raw JSON bytes, so opening a table costs
+    nothing per document and every access returns a fresh copy.
+    """
+
+    def __init__(self, buffer: bytes, ids: list, spans: list):
+        self.buffer = buffer
+        self.spans = dict(zip(ids, zip(spans[0::2], spans[1::2])))
+
+    def __getitem__(self, doc_id):
+        offset, length = self.spans[doc_id]
+        return json.loads(self.buffer[offset:offset + length])
+
+    def __contains__(self, doc_id):
+        return doc_id in self.spans
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+
+class CheckpointedJSONStorage(TinyStorage):
+    """TinyDB storage that keeps a compact index checkpoint next to the data.
+
+    The data file stays in TinyDB's JSON layout. Every write also saves
+    ``<path>.idx`` with the byte span and ``key`` field of each document,
+    stamped with the data file's mtime and size. When the checkpoint matches
+    the file, opening the store only loads the checkpoint and documents are
+    parsed lazily; ``doc_ids_for`` resolves keys without touching values.
+    Files without a valid checkpoint are parsed once and get one on the next
+    write. Readers keep using the cached view while the generation is unchanged.
+    """
+
+    def __init__(self, path: str, create_dirs: bool = False, encoding: str = None, access_mode: str = 'r+'):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        if any(character in access_mode for character in ('+', 'w', 'a')):
+            touch(path, create_dirs=create_dirs)
+        self._handle = open(path, mode=access_mode, encoding=encoding)
+        self._stamp = None
+        self._buffer = None
+        self._tables = None
+        self._keys = None
+        self._key_maps = {}
+        # Readers holding a shared file lock may refresh the cached view concurrently
+        self._lock = threading.RLock()
+
+    def _file_stamp(self):
+        stat = os.fstat(self._handle.fileno())
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def generation(self):
+        """Identify the current version of the file.
+
+        File mtimes are coarse, so the checkpoint's inode is included as well:
+        every write replaces the checkpoint, and the new file is created while
+        the old one still exists, so consecutive checkpoints never share an inode.
+        """
+        try:
+            index_inode = os.stat(self.index_path).st_ino
+        except OSError:
+            index_inode = None
+        return self._file_stamp() + [index_inode]
+
+    def _load_checkpoint(self, generation):
+        try:
+            with open(self.index_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if checkpoint.get('stamp') != generation[:2]:
+            return False
+        with open(self.path, 'rb') as f:
+            buffer = f.read()
+        self._cache(buffer, checkpoint['tables'], generation)
+        return True
+
+    def _refresh(self) -> bool:
+        """Make sure the cached view matches the file. Returns False if the store is empty."""
+        generation = self.generation()
+        if generation == self._stamp:
+            return self._tables is not None
+        if not generation[1]:
+            self._stamp, self._buffer, self._tables, self._keys, self._key_maps = generation, None, None, None, {}
+            return False
+        if not self._load_checkpoint(generation):
+            # No usable checkpoint: parse the file once. The checkpoint itself is
+            # saved by the next write, which holds the exclusive lock.
+            self._handle.seek(0)
+            self._cache(*self._encode(json.load(self._handle)), generation)
+        return True
+
+    def read(self):
+        with self._lock:
+            if not self._refresh():
+                return None
+            # TinyDB replaces tables in the returned dict before writing, so hand out a copy
+            return dict(self._tables)
+
+    def read_raw(self) -> bytes:
+        """Return the encoded file behind the cached view, or b'' for an empty store.
+
+        Writes replace the buffer instead of modifying it, so callers may use
+        it after releasing their lock.
+        """
+        with self._lock:
+            if not self._refresh():
+                return b''
+            return self._buffer
+
+    def doc_ids_for(self, table: str, key: str) -> list:
+        """Return the ids of documents in ``table`` whose ``key`` field equals ``key``."""
+        with self._lock:
+            if not self._refresh() or table not in self._keys:
+                return []
+            return self._doc_ids_for(table, key)
+
+    def _doc_ids_for(self, table: str, key: str) -> list:
+        if table not in self._key_maps:
+            ids, keys = self._keys[table]
+            key_map = dict(zip(keys, ids))
+            if len(key_map) != len(keys):
+                # Duplicate or missing keys: fall back to lists of ids
+                key_map = {}
+                for doc_id, doc_key in zip(ids, keys):
+                    if doc_key is not None:
+                        key_map.setdefault(doc_key, []).append(doc_id)
+            self._key_maps[table] = key_map
+        doc_ids = self._key_maps[table].get(key, ())
+        return [int(doc_ids)] if isinstance(doc_ids, str) else [int(doc_id) for doc_id in doc_ids]
+
+    def write(self, data):
+        with self._lock:
+            self._write(data)
+
+    def _cache(self, buffer: bytes, checkpoint: dict, generation):
+        self._buffer = buffer
+        self._tables = {name: LazyTable(buffer, table['ids'], table['spans']) for name, table in checkpoint.items()}
+        self._keys = {name: (table['ids'], table['keys']) for name, table in checkpoint.items()}
+        self._key_maps = {}
+        self._stamp = generation
+
+    @staticmethod
+    def _encode(data):
+        """Serialise tables in TinyDB's layout, recording each document's span and key."""
+        chunks = [b'{']
+        position = 1
+        checkpoint = {}
+        for table_number, (name, docs) in enumerate(data.items()):
+            prefix = (', ' if table_number else '') + json.dumps(name) + ': {'
+            chunks.append(prefix.encode())
+            position += len(chunks[-1])
+            ids, spans, keys = [], [], []
+            for doc_number, (doc_id, doc) in enumerate(docs.items()):
+                doc_id = str(doc_id)
+                chunks.append(((', ' if doc_number else '') + json.dumps(doc_id) + ': ').encode())
+                position += len(chunks[-1])
+                encoded = json.dumps(doc).encode()
+                chunks.append(encoded)
+                ids.append(doc_id)
+                spans.extend((position, len(encoded)))
+                key = doc.get('key')
+                keys.append(key if isinstance(key, str) else None)
+                position += len(encoded)
+            chunks.append(b'}')
+            position += 1
+            checkpoint[name] = {'ids': ids, 'spans': spans, 'keys': keys}
+        chunks.append(b'}')
+        return b''.join(chunks), checkpoint
+
+    def _write(self, data):
+        buffer, checkpoint = self._encode(data)
+        self._handle.seek(0)
+        self._handle.write(buffer.decode())
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
+
+        stamp = self._file_stamp()
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'stamp': stamp, 'tables': checkpoint}, f)
+        os.replace(tmp_path, self.index_path)
+        self._cache(buffer, checkpoint, self.generation())
+
+    def close(self):
+        self._handle.close()
@@ -0,0 +1,79 @@
+import os
+
+import Pyro5.api
+import Pyro5.callcontext
+import Pyro5.serializers
+import serpent
+
+# Fastest first. msgpack and marshal carry bytes as raw buffers; serpent base64-encodes them.
+PREFERRED_SERIALIZERS = ('msgpack', 'marshal', 'serpent')
+# Serializers without a bytes type, which send bytes as {'data': ..., 'encoding': 'base64'}
+BASE64_SERIALIZERS = ('serpent', 'json')
+
+
+def available_serializers() -> list:
+    """Serializers usable in this process, in order of preference."""
+    return [name for name in PREFERRED_SERIALIZERS if name in Pyro5.serializers.serializers]
+
+
+def call_serializer() -> str:
+    """Name of the serializer the current Pyro call arrived with, or None outside a call."""
+    serializer = Pyro5.serializers.serializers_by_id.get(Pyro5.callcontext.current_context.serializer_id)
+    return next((name for name, instance in Pyro5.serializers.serializers.items() if instance is serializer), None)
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if value.get('encoding') == 'base64' and set(value) == {'data', 'encoding'}:
+            return serpent.tobytes(value)
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_decode(item) for item in value)
+    return value
+
+
+def from_wire(value, serializer: str = None):
+    """Turn bytes that a serpent or json peer sent as base64 back into bytes, at any depth.
+
+    ``serializer`` defaults to the one of the current call. Values that came
+    over msgpack or marshal are returned untouched, so dicts that merely look
+    like encoded bytes are never converted. Nested bytes are decoded too, so a
+    serpent caller gets the same outcome as a binary one: stores keep bytes
+    only as a whole value and reject writes with bytes nested inside one.
+    """
+    if (serializer or call_serializer()) not in BASE64_SERIALIZERS:
+        return value
+    return _decode(value)
+
+
+class KeyValueProxy(Pyro5.api.Proxy):
+    """Proxy that hands bytes back as bytes whichever serializer it uses.
+
+    With serpent or json, values returned by reads, lookups and streamed
+    exports are passed through from_wire.
+    """
+
+    DECODED_METHODS = frozenset({'read', 'read_many', 'find', 'find_range', 'get_next_stream_item'})
+
+    def _pyroInvoke(self, methodname, vargs, kwargs, flags=0, objectId=None):
+        result = super()._pyroInvoke(methodname, vargs, kwargs, flags, objectId)
+        if methodname in self.DECODED_METHODS and self._pyroSerializer in BASE64_SERIALIZERS:
+            return from_wire(result, self._pyroSerializer)
+        return result
+
+
+def connect(uri: str, serializer: str = None) -> KeyValueProxy:
+    """Open a proxy to a KeyValueServer using the best serializer both sides support.
+
+    The choice is made per connection: the server is asked for its serializers
+    over marshal, which every Pyro5 installation has. ``serializer`` or the
+    ``KVSTORE_SERIALIZER`` environment variable force a specific one.
+    """
+    proxy = KeyValueProxy(uri)
+    serializer = serializer or os.getenv('KVSTORE_SERIALIZER')
+    if serializer is None:
+        proxy._pyroSerializer = 'marshal'
+        supported = set(proxy.serializers())
+        serializer = next(name for name in available_serializers() if name in supported)
+    proxy._pyroSerializer = serializer
+    return proxy
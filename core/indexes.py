@@ -0,0 +1,86 @@
+import bisect
+from numbers import Number
+
+_MISSING = object()
+
+
+def _entry(value, doc_id=None):
+    # Booleans, numbers and strings are kept in separate ranges so they never
+    # get compared, and True never matches 1
+    rank = 0 if isinstance(value, bool) else 1 if isinstance(value, Number) else 2
+    return (rank, value) if doc_id is None else (rank, value, doc_id)
+
+
+class FieldIndex:
+    """In-memory secondary index on a field inside structured values.
+
+    ``field`` is a dotted path into the value, optionally prefixed with
+    ``value.`` (``value.owner`` and ``owner`` are equivalent). Only scalar
+    field values (booleans, numbers and strings) are indexed. The index maps
+    field values to TinyDB document ids and keeps a sorted list for range
+    scans, in which booleans sort before numbers and numbers before strings.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        path = field[len('value.'):] if field.startswith('value.') else field
+        self.path = path.split('.') if path else []
+        self.postings = {}
+        self.sorted_entries = []
+        self.by_doc = {}
+
+    def extract(self, value):
+        for part in self.path:
+            if not isinstance(value, dict) or part not in value:
+                return _MISSING
+            value = value[part]
+        if isinstance(value, (str, Number)):
+            return value
+        return _MISSING
+
+    def clear(self):
+        self.postings.clear()
+        self.sorted_entries.clear()
+        self.by_doc.clear()
+
+    def add(self, doc_id: int, value):
+        self.remove(doc_id)
+        field_value = self.extract(value)
+        if field_value is _MISSING:
+            return
+        self.by_doc[doc_id] = field_value
+        self.postings.setdefault(_entry(field_value), set()).add(doc_id)
+        bisect.insort(self.sorted_entries, _entry(field_value, doc_id))
+
+    def remove(self, doc_id: int):
+        field_value = self.by_doc.pop(doc_id, _MISSING)
+        if field_value is _MISSING:
+            return
+        doc_ids = self.postings[_entry(field_value)]
+        doc_ids.discard(doc_id)
+        if not doc_ids:
+            del self.postings[_entry(field_value)]
+        entry = _entry(field_value, doc_id)
+        position = bisect.bisect_left(self.sorted_entries, entry)
+        if position < len(self.sorted_entries) and self.sorted_entries[position] == entry:
+            del self.sorted_entries[position]
+
+    def find(self, value) -> set:
+        return set(self.postings.get(_entry(value), ()))
+
+    def find_range(self, lo=None, hi=None) -> list:
+        """Document ids whose field lies in ``[lo, hi]``, in field order.
+
+        An open end is unbounded within the type of the other bound. Bounds of
+        different types span the types between them, so ``find_range(1, 'z')``
+        returns numbers from 1 up, then strings up to ``'z'``.
+        """
+        if lo is None and hi is None:
+            return [entry[2] for entry in self.sorted_entries]
+        lo_rank = _entry(lo if lo is not None else hi)[0]
+        hi_rank = _entry(hi if hi is not None else lo)[0]
+        start_key = (lo_rank, lo) if lo is not None else (lo_rank,)
+        end_key = (hi_rank, hi, float('inf')) if hi is not None else (hi_rank + 1,)
+        start = bisect.bisect_left(self.sorted_entries, start_key)
+        end = bisect.bisect_right(self.sorted_entries, end_key)
+        return [entry[2] for entry in self.sorted_entries[start:end]]
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+from filelock import Timeout
+
+try:
+    import fcntl
+except ImportError:  # Windows: callers fall back to an exclusive FileLock
+    fcntl = None
+
+
+class ReadWriteFileLock:
+    """Cross-process reader/writer lock built on ``fcntl.flock``.
+
+    ``acquire_shared`` takes a shared lock that any number of readers can
+    hold at once; ``acquire`` takes an exclusive lock, so it can stand in for
+    a ``filelock.FileLock``. Every acquisition opens its own descriptor, so
+    threads of one process exclude each other the same way processes do.
+    Locks are re-entrant per thread, but a thread holding a shared lock
+    cannot upgrade it to an exclusive one.
+    """
+
+    def __init__(self, lock_file: str, timeout: float = -1, poll_interval: float = 0.005):
+        if fcntl is None:
+            raise RuntimeError("Shared locking requires fcntl")
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+
+    @property
+    def is_locked(self) -> bool:
+        return getattr(self._local, 'depth', 0) > 0
+
+    def _acquire(self, operation):
+        state = self._local
+        if getattr(state, 'depth', 0):
+            if state.exclusive or operation == fcntl.LOCK_SH:
+                state.depth += 1
+                return
+            raise RuntimeError("Cannot upgrade a shared lock to an exclusive lock")
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout < 0 else time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() > deadline:
+                    os.close(fd)
+                    raise Timeout(self.lock_file)
+                time.sleep(self.poll_interval)
+        state.fd = fd
+        state.exclusive = operation == fcntl.LOCK_EX
+        state.depth = 1
+
+    def acquire(self):
+        self._acquire(fcntl.LOCK_EX)
+
+    def acquire_shared(self):
+        self._acquire(fcntl.LOCK_SH)
+
+    def release(self):
+        state = self._local
+        state.depth -= 1
+        if state.depth == 0:
+            fcntl.flock(state.fd, fcntl.LOCK_UN)
+            os.close(state.fd)
+            state.fd = None
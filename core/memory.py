@@ -0,0 +1,351 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+
+from core.config import logger
+from core.indexes import FieldIndex
+from core.scheduler import default_scheduler
+from core.snapshots import SnapshotManager
+from core.storage import batches, pack_bytes, unpack_bytes
+
+
+class _Encoded(str):
+    """JSON text of a structured value, decoded into a fresh copy on every read."""
+    __slots__ = ()
+
+
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+
+def _freeze(value):
+    # Structured values are kept as JSON, like Storage does, so callers never
+    # share mutable objects with the store and unserialisable values fail up front
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, _IMMUTABLE):
+        return value
+    return _Encoded(json.dumps(pack_bytes(value)))
+
+
+def _thaw(value):
+    return unpack_bytes(json.loads(value)) if type(value) is _Encoded else value
+
+
+class _Record:
+    __slots__ = ('doc_id', 'key', 'value', 'expiration')
+
+    def __init__(self, doc_id, key, value, expiration):
+        self.doc_id = doc_id
+        self.key = key
+        self.value = value
+        self.expiration = expiration
+
+    def expired(self, now):
+        return self.expiration is not None and now > self.expiration
+
+
+class MemoryStorage:
+    """Pure in-memory store with the Storage API, for ephemeral labels.
+
+    Nothing touches TinyDB or the FileLock; a threading lock guards a dict of
+    slotted records. Structured values are held as JSON text, so like with
+    Storage every read returns a copy. ``max_entries`` caps the number of
+    entries, not the memory they use: when it is reached, expired entries are
+    purged first, then the oldest entries are evicted. With
+    ``snapshot_interval`` set, the contents are periodically written through
+    a SnapshotManager in the TinyDB layout and reloaded on startup.
+    """
+
+    def __init__(self, label: str, cache_path: str, indexes: list = None, max_entries: int = None,
+                 snapshot_interval: float = None):
+        self.label = label
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.snapshot_interval = snapshot_interval
+        self.records = {}
+        self.by_id = {}
+        self.lock = threading.RLock()
+        self.indexes = {}
+        self._next_id = 1
+        self._snapshots = None
+        self.maintenance_tasks = []
+        if snapshot_interval:
+            if self.list_snapshots():
+                self.restore()
+            self.scheduler = default_scheduler()
+            self.maintenance_tasks.append(f"memory:{self.label}:snapshot")
+            self.scheduler.add(self.maintenance_tasks[-1], lambda: self.snapshot(incremental=True), snapshot_interval)
+        for field in indexes or []:
+            self.create_index(field)
+
+    @property
+    def snapshots(self) -> SnapshotManager:
+        if self._snapshots is None:
+            self._snapshots = SnapshotManager(os.path.join(self.cache_path, 'SNAPSHOTS', self.label))
+        return self._snapshots
+
+    def start_cleanup_thread(self):
+        self.schedule_maintenance()
+
+    def schedule_maintenance(self, scheduler=None, sweep_interval: float = 3600, sweep_budget: float = 0.05):
+        """Register TTL sweeps with a shared scheduler."""
+        self.scheduler = scheduler or getattr(self, 'scheduler', None) or default_scheduler()
+        self.maintenance_tasks.append(f"memory:{self.label}:sweep")
+        self.scheduler.add(self.maintenance_tasks[-1], self.cleanup_expired_entries, sweep_interval,
+                           budget=sweep_budget, adaptive=True)
+
+    def _insert(self, key: str, value: any, expiration: float = None):
+        """Store a value already passed through _freeze."""
+        if not self._remove(key) and self.max_entries is not None and len(self.records) >= self.max_entries:
+            self._make_room()
+        record = _Record(self._next_id, key, value, expiration)
+        self._next_id += 1
+        self.records[key] = record
+        self.by_id[record.doc_id] = record
+        for index in self.indexes.values():
+            index.add(record.doc_id, _thaw(value))
+
+    def _unindex(self, record: _Record):
+        for index in self.indexes.values():
+            index.remove(record.doc_id)
+
+    def _remove(self, key: str) -> bool:
+        record = self.records.pop(key, None)
+        if record is None:
+            return False
+        del self.by_id[record.doc_id]
+        self._unindex(record)
+        return True
+
+    def _make_room(self):
+        if self._purge_expired() == 0:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            self._remove(next(iter(self.records)))
+            logger.warning(f"Memory store {self.label} is full; evicted the oldest entry")
+
+    def _purge_expired(self) -> int:
+        now = time.time()
+        expired = [key for key, record in self.records.items() if record.expired(now)]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def _purge_expired_batch(self, batch_size: int) -> int:
+        now = time.time()
+        expired = []
+        for key, record in self.records.items():
+            if record.expired(now):
+                expired.append(key)
+                if len(expired) >= batch_size:
+                    break
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def _live(self, key: str):
+        record = self.records.get(key)
+        if record is not None and record.expired(time.time()):
+            self._remove(key)
+            return None
+        return record
+
+    def create(self, key: str, value: any, seconds: int = None) -> bool:
+        try:
+            value = _freeze(value)
+        except Exception as e:
+            logger.error(f"Failed to create entry: {e}")
+            return False
+        with self.lock:
+            self._insert(key, value, None if seconds is None else time.time() + seconds)
+            return True
+
+    def create_many(self, items: dict, seconds: int = None) -> bool:
+        expiration = None if seconds is None else time.time() + seconds
+        try:
+            items = {key: _freeze(value) for key, value in items.items()}
+        except Exception as e:
+            logger.error(f"Failed to create entries: {e}")
+            return False
+        with self.lock:
+            for key, value in items.items():
+                self._insert(key, value, expiration)
+            return True
+
+    def read(self, key: str):
+        with self.lock:
+            record = self._live(key)
+            value = None if record is None else record.value
+        return _thaw(value)
+
+    def read_many(self, keys: list) -> dict:
+        with self.lock:
+            now = time.time()
+            found = {}
+            for key in keys:
+                record = self.records.get(key)
+                if record is not None and not record.expired(now):
+                    found[key] = record.value
+        return {key: _thaw(value) for key, value in found.items()}
+
+    def update(self, key: str, new_value: any, days: int = None) -> bool:
+        try:
+            frozen = _freeze(new_value)
+        except Exception as e:
+            logger.error(f"Failed to update entry: {e}")
+            return False
+        with self.lock:
+            record = self._live(key)
+            if record is None:
+                return False
+            record.value = frozen
+            if days is not None:
+                record.expiration = time.time() + days * 86400
+            for index in self.indexes.values():
+                index.add(record.doc_id, _thaw(frozen))
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self.lock:
+            return self._remove(key)
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        try:
+            with self.lock:
+                record = self._live(key)
+                if record is None:
+                    self._insert(key, amount)
+                    return amount
+                new_count = _thaw(record.value) + amount
+                record.value = _freeze(new_count)
+                for index in self.indexes.values():
+                    index.add(record.doc_id, new_count)
+                return new_count
+        except Exception as e:
+            logger.error(f"Failed to increment value: {e}")
+        return amount
+
+    def keys(self, pattern: str):
+        with self.lock:
+            now = time.time()
+            return fnmatch.filter([key for key, record in self.records.items() if not record.expired(now)], pattern)
+
+    def create_index(self, field: str) -> bool:
+        with self.lock:
+            if field not in self.indexes:
+                index = self.indexes[field] = FieldIndex(field)
+                for record in self.records.values():
+                    index.add(record.doc_id, _thaw(record.value))
+            return True
+
+    def drop_index(self, field: str) -> bool:
+        return self.indexes.pop(field, None) is not None
+
+    def _fetch(self, doc_ids) -> dict:
+        now = time.time()
+        records = [self.by_id[doc_id] for doc_id in doc_ids]
+        return {record.key: _thaw(record.value) for record in records if not record.expired(now)}
+
+    def find(self, field: str, value: any) -> dict:
+        with self.lock:
+            if field not in self.indexes:
+                logger.error(f"No index declared on field: {field}")
+                return {}
+            return self._fetch(self.indexes[field].find(value))
+
+    def find_range(self, field: str, lo: any = None, hi: any = None) -> dict:
+        with self.lock:
+            if field not in self.indexes:
+                logger.error(f"No index declared on field: {field}")
+                return {}
+            return self._fetch(self.indexes[field].find_range(lo, hi))
+
+    def cleanup_expired_entries(self, budget: float = None, batch_size: int = 10000):
+        """Remove expired entries, releasing the lock between batches and stopping once ``budget`` is spent."""
+        deadline = None if budget is None else time.monotonic() + budget
+        removed_count = 0
+        while deadline is None or time.monotonic() < deadline:
+            with self.lock:
+                removed = self._purge_expired_batch(batch_size)
+            removed_count += removed
+            if removed < batch_size:
+                break
+        logger.info(f"Cleaned up {removed_count} expired entries.")
+        return removed_count
+
+    def bulk_load(self, records, seconds: int = None, replace: bool = False) -> int:
+        """Load ``{'key', 'value'[, 'expiration']}`` records, replacing entries with the same key."""
+        expiration = None if seconds is None else time.time() + seconds
+        loaded = set()
+        with self.lock:
+            if replace:
+                self.records.clear()
+                self.by_id.clear()
+                for index in self.indexes.values():
+                    index.clear()
+            try:
+                for record in records:
+                    self._insert(record['key'], _freeze(record['value']),
+                                 expiration if seconds is not None else record.get('expiration'))
+                    loaded.add(record['key'])
+            except Exception as e:
+                logger.error(f"Failed to bulk load entries: {e}")
+        return len(loaded)
+
+    def iter_records(self, batch_size: int = 1000):
+        """Yield live entries as records, holding the lock for one batch at a time."""
+        with self.lock:
+            keys = list(self.records)
+        for batch in batches(keys, batch_size):
+            now = time.time()
+            with self.lock:
+                live = [self.records.get(key) for key in batch]
+                live = [record for record in live if record is not None and not record.expired(now)]
+            for record in live:
+                item = {'key': record.key, 'value': _thaw(record.value)}
+                if record.expiration is not None:
+                    item['expiration'] = record.expiration
+                yield item
+
+    def export(self, stream, format: str = 'jsonl', batch_size: int = 1000) -> int:
+        from core.bulk import write_records
+        return write_records(stream, self.iter_records(batch_size), format)
+
+    def snapshot(self, incremental: bool = False, **metadata) -> dict:
+        """Write the contents to disk in the TinyDB layout used by file-backed snapshots."""
+        with self.lock:
+            docs = {}
+            for record in self.records.values():
+                doc = {'key': record.key, 'value': pack_bytes(_thaw(record.value))}
+                if record.expiration is not None:
+                    doc['expiration'] = record.expiration
+                docs[str(record.doc_id)] = doc
+            raw = json.dumps({'_default': docs}).encode()
+        return self.snapshots.write(raw, incremental=incremental, **metadata)
+
+    def list_snapshots(self) -> list:
+        return self.snapshots.list()
+
+    def restore(self, snapshot_id: str = None) -> bool:
+        try:
+            data = self.snapshots.load(snapshot_id)
+        except Exception as e:
+            logger.error(f"Failed to restore snapshot: {e}")
+            return False
+        with self.lock:
+            self.records.clear()
+            self.by_id.clear()
+            for index in self.indexes.values():
+                index.clear()
+            for doc in data.get('_default', {}).values():
+                self._insert(doc['key'], _freeze(unpack_bytes(doc['value'])), doc.get('expiration'))
+            return True
+
+    def shutdown(self):
+        logger.info("Shutdown signal received")
+        # remove() waits for a run in progress, so no sweep or snapshot outlives the store
+        for name in self.maintenance_tasks:
+            self.scheduler.remove(name)
+        if self.snapshot_interval:
+            self.snapshot()
@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from core.client import connect
+from core.config import logger
+from core.storage import locked_db, pack_bytes, unpack_bytes
+
+
+class MutationLog:
+    """Append-only log of mutations applied by a primary server.
+
+    Servers log the documents each mutation left behind for the keys it
+    touched (``replace_records``), so entries replay identically on any
+    replica, at any delay, any number of times.
+    Entries are kept in memory for streaming to replicas and appended to
+    ``<db_path>.log`` so the tail survives a primary restart. Only the last
+    ``retention`` entries are kept; replicas that fall further behind must
+    resynchronise from a snapshot.
+    """
+
+    def __init__(self, path: str, retention: int = 100000):
+        self.path = path
+        self.retention = retention
+        self.entries = deque(maxlen=retention)
+        self.seq = 0
+        self._lines_on_disk = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    if entry['op'] is not None:
+                        entry['args'] = [unpack_bytes(arg) for arg in entry['args']]
+                    self.seq = entry['seq']
+                    if entry['op'] is not None:
+                        self.entries.append(entry)
+                    self._lines_on_disk += 1
+
+    @property
+    def start(self) -> int:
+        """Sequence number of the oldest retained entry."""
+        return self.entries[0]['seq'] if self.entries else self.seq + 1
+
+    def append(self, op: str, *args) -> int:
+        self.seq += 1
+        entry = {'seq': self.seq, 'op': op, 'args': list(args), 'time': time.time()}
+        self.entries.append(entry)
+        with open(self.path, 'a') as f:
+            f.write(self._encode(entry) + '\n')
+        self._lines_on_disk += 1
+        if self._lines_on_disk > 2 * self.retention:
+            self._compact()
+        return self.seq
+
+    @staticmethod
+    def _encode(entry: dict) -> str:
+        # Bytes arguments are tagged and untagged again by _load
+        return json.dumps({**entry, 'args': [pack_bytes(arg) for arg in entry['args']]}, default=pack_bytes)
+
+    def reset(self):
+        """Discard retained entries so every replica resynchronises from a snapshot."""
+        self.seq += 1
+        self.entries.clear()
+        with open(self.path, 'w') as f:
+            # Marker line preserving the sequence number across restarts
+            f.write(json.dumps({'seq': self.seq, 'op': None}) + '\n')
+        self._lines_on_disk = 1
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({'seq': self.start - 1, 'op': None}) + '\n')
+            for entry in self.entries:
+                f.write(self._encode(entry) + '\n')
+        os.replace(tmp_path, self.path)
+        self._lines_on_disk = len(self.entries) + 1
+
+    def since(self, seq: int, limit: int = 1000) -> list:
+        """Return up to ``limit`` entries with a sequence number greater than ``seq``."""
+        if seq >= self.seq:
+            return []
+        offset = max(0, seq - self.start + 1)
+        return [self.entries[i] for i in range(offset, min(len(self.entries), offset + limit))]
+
+
+class ReplicationClient:
+    """Keeps a local Storage in sync with a primary KeyValueServer.
+
+    The client polls the primary for log entries after its last applied
+    sequence number and replays them on the local store. When it is too far
+    behind (or on first start) it installs a full snapshot first. The applied
+    sequence number is persisted in ``<db_path>.seq`` so restarts resume from
+    the log tail.
+    """
+
+    def __init__(self, storage, primary_uri: str, interval: float = 0.5, batch_size: int = 1000):
+        self.storage = storage
+        self.primary_uri = primary_uri
+        self.interval = interval
+        self.batch_size = batch_size
+        self.seq_path = f"{storage.db_path}.seq"
+        self.applied_seq = self._load_seq()
+        self.primary_seq = None
+        self.caught_up_at = None
+        self.last_error = None
+        self._proxy = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def _load_seq(self) -> int:
+        if os.path.exists(self.seq_path):
+            with open(self.seq_path) as f:
+                return int(f.read().strip() or 0)
+        return -1  # Never synced: forces an initial snapshot
+
+    def _save_seq(self):
+        with open(self.seq_path, 'w') as f:
+            f.write(str(self.applied_seq))
+
+    @property
+    def primary(self):
+        if self._proxy is None:
+            # A binary serializer, so bytes in log entries arrive as bytes rather than base64 dicts
+            self._proxy = connect(self.primary_uri)
+        return self._proxy
+
+    def start(self):
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self._proxy is not None:
+            # Only left over when sync_once was called outside the replication thread
+            self._proxy._pyroClaimOwnership()
+            self._release()
+
+    def _release(self):
+        self._proxy._pyroRelease()
+        self._proxy = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    while self.sync_once() and not self.stop_event.is_set():
+                        pass
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"Replication from {self.primary_uri} failed: {e}")
+                    if self._proxy is not None:
+                        self._release()
+                self.stop_event.wait(self.interval)
+        finally:
+            # The proxy belongs to this thread, so it has to be released here
+            if self._proxy is not None:
+                self._release()
+
+    def sync_once(self) -> bool:
+        """Pull and apply one batch from the primary. Returns True if more entries are pending."""
+        batch = self.primary.replication_log(self.applied_seq, self.batch_size)
+        if self.applied_seq + 1 < batch['start'] or self.applied_seq > batch['seq']:
+            self.install_snapshot(self.primary.replication_snapshot())
+            return True
+        for entry in batch['entries']:
+            self.apply(entry)
+        self.primary_seq = batch['seq']
+        if self.applied_seq >= self.primary_seq:
+            self.caught_up_at = time.time()
+            return False
+        return True
+
+    def apply(self, entry: dict):
+        getattr(self.storage, entry['op'])(*entry['args'])
+        self.applied_seq = entry['seq']
+        self._save_seq()
+
+    def install_snapshot(self, snapshot):
+        """Replace the local store with a snapshot streamed by the primary in batches."""
+        records, seq = [], None
+        for batch in snapshot:
+            seq = batch['seq']
+            records.extend(batch['records'])
+        with locked_db(self.storage.db, self.storage.db_lock):
+            self.storage.db.truncate()
+            self.storage.db.insert_multiple(records)
+            self.storage._rebuild_indexes()
+        self.applied_seq = seq
+        self._save_seq()
+        logger.info(f"Installed snapshot of {len(records)} records at seq {self.applied_seq}")
+
+    def status(self) -> dict:
+        lag_ops = None if self.primary_seq is None else max(0, self.primary_seq - self.applied_seq)
+        # Time since the replica was last confirmed caught up: an upper bound on read staleness
+        lag_seconds = None if self.caught_up_at is None else time.time() - self.caught_up_at
+        return {
+            'primary': self.primary_uri,
+            'applied_seq': self.applied_seq,
+            'primary_seq': self.primary_seq,
+            'lag_ops': lag_ops,
+            'lag_seconds': lag_seconds,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from core.config import logger
+
+
+class MaintenanceTask:
+    """A periodic maintenance job run by a MaintenanceScheduler.
+
+    ``function`` is called with ``budget=`` when a time budget is set and
+    should stop early once it is spent. With ``adaptive`` set, the function
+    returns how much work it did: the interval halves (down to
+    ``min_interval``) while there is work and doubles back (up to ``interval``)
+    once there is none.
+    """
+
+    def __init__(self, name: str, function, interval: float, jitter: float = 0.1, budget: float = None,
+                 adaptive: bool = False, min_interval: float = None):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.current_interval = interval
+        self.min_interval = min_interval if min_interval is not None else interval / 16
+        self.jitter = jitter
+        self.budget = budget
+        self.adaptive = adaptive
+        self.cancelled = False
+        self.stats = {'runs': 0, 'errors': 0, 'total_time': 0.0, 'last_time': None, 'max_time': 0.0,
+                      'over_budget': 0, 'last_result': None, 'interval': interval}
+
+    def next_delay(self) -> float:
+        spread = self.current_interval * self.jitter
+        return max(0.0, self.current_interval + random.uniform(-spread, spread))
+
+    def run(self):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = self.function(budget=self.budget) if self.budget is not None else self.function()
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Maintenance task {self.name} failed: {e}")
+        elapsed = time.perf_counter() - start
+        self.stats['runs'] += 1
+        self.stats['total_time'] += elapsed
+        self.stats['last_time'] = elapsed
+        self.stats['max_time'] = max(self.stats['max_time'], elapsed)
+        self.stats['last_result'] = result
+        if self.budget is not None and elapsed > self.budget:
+            self.stats['over_budget'] += 1
+        if self.adaptive and isinstance(result, int):
+            if result > 0:
+                self.current_interval = max(self.min_interval, self.current_interval / 2)
+            else:
+                self.current_interval = min(self.interval, self.current_interval * 2)
+            self.stats['interval'] = self.current_interval
+
+
+class MaintenanceScheduler:
+    """Single thread that runs maintenance tasks for any number of stores.
+
+    Tasks are kept in a heap ordered by their next run time. First runs are
+    spread randomly over the task interval and every later run is jittered,
+    so stores sharing a scheduler do not sweep in lockstep.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.queue = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.running = None
+
+    def add(self, name: str, function, interval: float, **options) -> MaintenanceTask:
+        task = MaintenanceTask(name, function, interval, **options)
+        with self.condition:
+            if name in self.tasks:
+                self.tasks[name].cancelled = True
+            self.tasks[name] = task
+            self._push(task, random.uniform(0, interval))
+            self.condition.notify_all()
+        return task
+
+    def remove(self, name: str):
+        """Cancel a task, waiting for a run of it that is in progress to finish.
+
+        Afterwards the task's function is no longer called, so its owner can
+        release what the function uses.
+        """
+        with self.condition:
+            task = self.tasks.pop(name, None)
+            if task is None:
+                return
+            task.cancelled = True
+            # A task removing itself from inside its run would wait forever
+            if threading.current_thread() is not self.thread:
+                while self.running is task:
+                    self.condition.wait()
+
+    def _push(self, task: MaintenanceTask, delay: float):
+        heapq.heappush(self.queue, (time.monotonic() + delay, next(self.counter), task))
+
+    def stats(self) -> dict:
+        with self.condition:
+            return {name: dict(task.stats) for name, task in self.tasks.items()}
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        with self.condition:
+            if not self.is_alive():
+                self.stop_event.clear()
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                while self.queue and self.queue[0][2].cancelled:
+                    heapq.heappop(self.queue)
+                if not self.queue:
+                    self.condition.wait()
+                    continue
+                due, _, task = self.queue[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    # Woken early when a task is added or the scheduler stops
+                    self.condition.wait(delay)
+                    continue
+                heapq.heappop(self.queue)
+                self.running = task
+            task.run()
+            with self.condition:
+                self.running = None
+                if not task.cancelled:
+                    self._push(task, task.next_delay())
+                # Wake remove() calls waiting for this run to finish
+                self.condition.notify_all()
+
+    def stop(self):
+        with self.condition:
+            self.stop_event.set()
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> MaintenanceScheduler:
+    """Return the process-wide scheduler, starting it on first use."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = MaintenanceScheduler()
+        _default_scheduler.start()
+        return _default_scheduler
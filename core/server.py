@@ -1,27 +1,49 @@
 import os
 import signal
+import time
 
-import Pyro5
+import Pyro5.server
+import Pyro5.errors
 
 from core.config import logger
 from core.stores import KeyValueServer
 
 
-def start_server(label, plugin=None, **plugin_kwargs):
+class TimedDaemon(Pyro5.server.Daemon):
+    """Daemon that reports the time from startup until its first request is served."""
+
+    def __init__(self, *args, started=None, **kwargs):
+        self.started = started or time.perf_counter()
+        self.first_request_time = None
+        super().__init__(*args, **kwargs)
+
+    def handleRequest(self, conn):
+        super().handleRequest(conn)
+        if self.first_request_time is None:
+            self.first_request_time = time.perf_counter() - self.started
+            logger.info(f"Time to first request: {self.first_request_time:.3f}s")
+
+
+def start_server(label, plugin=None, host=None, port=None, **plugin_kwargs):
+    started = time.perf_counter()
     try:
-        daemon = Pyro5.server.Daemon(host=os.getenv('KVSTORE_HOST', 'localhost'), port=int(os.getenv('KVSTORE_PORT', 6666)))
+        daemon = TimedDaemon(host=host or os.getenv('KVSTORE_HOST', 'localhost'),
+                             port=int(port or os.getenv('KVSTORE_PORT', 6666)), started=started)
+        plugin_kwargs.setdefault('cache_path', os.getenv('KVSTORE_CACHE_PATH', 'cache'))
         if plugin:
             store = plugin(label, **plugin_kwargs)
         else:
-            store = KeyValueServer(label)
-        uri = daemon.register(store)
-        logger.info(f"Server is ready. URI = {uri}")
+            store = KeyValueServer(label, **plugin_kwargs)
+        uri = daemon.register(store, objectId=label)
+        logger.info(f"Server is ready in {time.perf_counter() - started:.3f}s. URI = {uri}")
 
         def handle_signals(signum, frame):
             logger.info("Shutdown signal received, shutting down the server and cleanup thread...")
-            if store.cleanup_thread:
-                store.cleanup_thread.stop()
-            daemon.shutdown()
+            try:
+                store.shutdown()
+            finally:
+                # Stop serving even if the store failed to close cleanly
+                daemon.shutdown()
             logger.info("Server cleanly shut down.")
 
         signal.signal(signal.SIGINT, handle_signals)
@@ -35,4 +57,4 @@ def start_server(label, plugin=None, **plugin_kwargs):
 
 
 if __name__ == "__main__":
-    start_server("kv.nas")
\ No newline at end of file
+    start_server("kv.nas")
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+import zlib
+
+from core.config import logger
+
+
+class SnapshotManager:
+    """Point-in-time snapshots of a Storage file.
+
+    Taking a snapshot only holds the store lock while the store's cached
+    image of the file is grabbed; parsing, diffing and writing the snapshot
+    happen after the lock is released. Full snapshots are verbatim copies of
+    that image. Incremental snapshots record the documents that changed or were
+    removed since the previous snapshot, using per-document checksums kept in
+    ``manifest.json``. Restoring replays the chain in memory and writes the
+    store once.
+
+    After ``full_every`` incremental snapshots in a row, the next one is
+    taken in full so restore chains stay short. Only the newest ``keep``
+    full snapshots and their increments are kept; older ones are deleted.
+    """
+
+    def __init__(self, snapshot_dir: str, full_every: int = 24, keep: int = 3):
+        self.snapshot_dir = snapshot_dir
+        self.full_every = full_every
+        self.keep = keep
+        self.manifest_path = os.path.join(snapshot_dir, 'manifest.json')
+        self.lock = threading.Lock()
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {'snapshots': [], 'checksums': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: dict):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _path(self, snapshot: dict) -> str:
+        return os.path.join(self.snapshot_dir, f"{snapshot['id']}.{snapshot['type']}.json")
+
+    @staticmethod
+    def _checksums(data: dict) -> dict:
+        return {
+            table: {doc_id: zlib.crc32(json.dumps(doc, sort_keys=True).encode()) for doc_id, doc in docs.items()}
+            for table, docs in data.items()
+        }
+
+    def write(self, raw: bytes, incremental: bool = False, **metadata) -> dict:
+        """Persist a captured database image and return the snapshot metadata."""
+        data = json.loads(raw) if raw else {}
+        checksums = self._checksums(data)
+        with self.lock:
+            manifest = self._load_manifest()
+            previous = manifest['snapshots'][-1] if manifest['snapshots'] else None
+            incremental = incremental and previous is not None and self._chain_length(manifest) < self.full_every
+            snapshot = {
+                'id': f"{int(previous['id']) + 1 if previous else 1:06d}",
+                'type': 'incr' if incremental else 'full',
+                'base': previous['id'] if incremental else None,
+                'created': time.time(),
+                'records': sum(len(docs) for docs in data.values()),
+            }
+            snapshot.update(metadata)
+            if snapshot['type'] == 'full':
+                with open(self._path(snapshot), 'wb') as f:
+                    f.write(raw)
+            else:
+                old = manifest['checksums']
+                delta = {'upserts': {}, 'deletes': {}}
+                for table, docs in data.items():
+                    changed = {doc_id: doc for doc_id, doc in docs.items()
+                               if old.get(table, {}).get(doc_id) != checksums[table][doc_id]}
+                    if changed:
+                        delta['upserts'][table] = changed
+                for table, old_docs in old.items():
+                    removed = [doc_id for doc_id in old_docs if doc_id not in data.get(table, {})]
+                    if removed:
+                        delta['deletes'][table] = removed
+                snapshot['changes'] = sum(map(len, delta['upserts'].values())) + sum(map(len, delta['deletes'].values()))
+                with open(self._path(snapshot), 'w') as f:
+                    json.dump(delta, f)
+            manifest['snapshots'].append(snapshot)
+            manifest['checksums'] = checksums
+            pruned = self._prune(manifest)
+            self._save_manifest(manifest)
+            for old_snapshot in pruned:
+                os.remove(self._path(old_snapshot))
+        logger.info(f"Wrote {snapshot['type']} snapshot {snapshot['id']} ({snapshot['records']} records)")
+        return snapshot
+
+    @staticmethod
+    def _chain_length(manifest: dict) -> int:
+        """Number of incremental snapshots since the latest full one."""
+        length = 0
+        for snapshot in reversed(manifest['snapshots']):
+            if snapshot['type'] == 'full':
+                break
+            length += 1
+        return length
+
+    def _prune(self, manifest: dict) -> list:
+        """Drop snapshots older than the ``keep`` newest full ones from the manifest and return them."""
+        fulls = [snapshot for snapshot in manifest['snapshots'] if snapshot['type'] == 'full']
+        if len(fulls) <= self.keep:
+            return []
+        # Increments always chain back to a full snapshot taken before them
+        cutoff = fulls[-self.keep]['id']
+        pruned = [snapshot for snapshot in manifest['snapshots'] if snapshot['id'] < cutoff]
+        manifest['snapshots'] = [snapshot for snapshot in manifest['snapshots'] if snapshot['id'] >= cutoff]
+        return pruned
+
+    def list(self) -> list:
+        return self._load_manifest()['snapshots']
+
+    def load(self, snapshot_id: str = None) -> dict:
+        """Rebuild the database contents as of a snapshot (the latest by default)."""
+        snapshots = {snapshot['id']: snapshot for snapshot in self.list()}
+        if not snapshots:
+            raise RuntimeError(f"No snapshots in {self.snapshot_dir}")
+        snapshot = snapshots[snapshot_id or max(snapshots)]
+        chain = [snapshot]
+        while chain[-1]['type'] == 'incr':
+            chain.append(snapshots[chain[-1]['base']])
+        with open(self._path(chain.pop())) as f:
+            content = f.read()
+        data = json.loads(content) if content else {}
+        for snapshot in reversed(chain):
+            with open(self._path(snapshot)) as f:
+                delta = json.load(f)
+            for table, docs in delta['upserts'].items():
+                data.setdefault(table, {}).update(docs)
+            for table, doc_ids in delta['deletes'].items():
+                for doc_id in doc_ids:
+                    data.get(table, {}).pop(doc_id, None)
+        return data
@@ -1,12 +1,54 @@
 import os
+import json
+import base64
+import fnmatch
+import itertools
 import threading
 import time
 from contextlib import contextmanager
 
 from filelock import FileLock, Timeout
-from tinydb import TinyDB, Query
+from tinydb import TinyDB
 from datetime import datetime, timedelta
+from core.checkpoint import CheckpointedJSONStorage
 from core.config import logger
+from core.indexes import FieldIndex
+from core.locks import ReadWriteFileLock, fcntl
+from core.scheduler import default_scheduler
+from core.snapshots import SnapshotManager
+
+
+BYTES_TAG = '__bytes__'
+# Wraps user dicts that would otherwise be mistaken for a tagged value
+ESCAPE_TAG = '__escaped__'
+
+
+def pack_bytes(value: any) -> any:
+    """Make bytes-like values JSON-safe by wrapping them in a tagged base64 dict."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {BYTES_TAG: base64.b64encode(value).decode()}
+    if isinstance(value, dict) and len(value) == 1 and (BYTES_TAG in value or ESCAPE_TAG in value):
+        return {ESCAPE_TAG: value}
+    return value
+
+
+def unpack_bytes(value: any) -> any:
+    if isinstance(value, dict) and len(value) == 1:
+        if BYTES_TAG in value:
+            return base64.b64decode(value[BYTES_TAG])
+        if ESCAPE_TAG in value:
+            return value[ESCAPE_TAG]
+    return value
+
+
+def batches(items, batch_size: int):
+    """Yield lists of up to ``batch_size`` items from any iterable."""
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
 @contextmanager
@@ -18,62 +60,200 @@ def locked_db(db, lock):
         lock.release()
 
 
-class PeriodicExecutor:
-    def __init__(self, interval, function, *args, **kwargs):
-        self.interval = interval
-        self.function = function
-        self.args = args
-        self.kwargs = kwargs
-        self.thread = threading.Thread(target=self.run, daemon=True)
-        self.stop_event = threading.Event()
-
-    def is_alive(self):
-        return self.thread.is_alive()
-
-    def start(self):
-        self.thread.start()
-
-    def run(self):
-        next_run_time = time.time()
-        while not self.stop_event.is_set():
-            time.sleep(max(0, next_run_time - time.time()))  # Sleep only the necessary time
-            if self.stop_event.is_set():  # Check again before proceeding
-                break
-            try:
-                self.function(*self.args, **self.kwargs)
-            except Exception as e:
-                logger.error(f"Error during periodic execution: {e}")
-            next_run_time += self.interval
-
-    def stop(self):
-        self.stop_event.set()
-        self.thread.join()
+@contextmanager
+def shared_db(db, lock):
+    """Like locked_db, but takes a shared lock when the lock supports it."""
+    acquire = getattr(lock, 'acquire_shared', lock.acquire)
+    try:
+        acquire()
+        yield db
+    finally:
+        lock.release()
 
 
 class Storage:
-    def __init__(self, label: str, cache_path: str):
+    def __init__(self, label: str, cache_path: str, indexes: list = None, shared_reads: bool = False):
         try:
             self.label = label
+            self.cache_path = cache_path
             self.db_path = os.path.join(cache_path, 'STORES', f"{label}.db")
             os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-            self.db = TinyDB(self.db_path)
-            self.db_lock = FileLock(f"{self.db_path}.lock", timeout=int(os.getenv('DB_LOCK_TIMEOUT', 10)))
+            self.db = TinyDB(self.db_path, storage=CheckpointedJSONStorage)
+            lock_timeout = int(os.getenv('DB_LOCK_TIMEOUT', 10))
+            if shared_reads and fcntl is not None:
+                # Readers share the lock; only mutations take it exclusively
+                self.db_lock = ReadWriteFileLock(f"{self.db_path}.lock", timeout=lock_timeout)
+            else:
+                self.db_lock = FileLock(f"{self.db_path}.lock", timeout=lock_timeout)
         except Exception as e:
             logger.error(f"Initialization failed: {e}")
             raise RuntimeError(f"Failed to initialize KeyValueStore: {e}")
+        self._snapshots = None
+        self.indexes = {}
+        self._index_stamp = None
+        self._index_lock = threading.Lock()
+        self._sweep_offset = 0
+        for field in indexes or []:
+            self.create_index(field)
+
+    @property
+    def snapshots(self) -> SnapshotManager:
+        if self._snapshots is None:
+            self._snapshots = SnapshotManager(os.path.join(self.cache_path, 'SNAPSHOTS', self.label))
+        return self._snapshots
 
     def start_cleanup_thread(self):
-        self.cleanup_thread = PeriodicExecutor(3600, self.cleanup_expired_entries)  # every hour
-        self.cleanup_thread.start()
+        self.schedule_maintenance()
 
-    def create(self, key: str, value: any, seconds: int = None) -> bool:
+    def schedule_maintenance(self, scheduler=None, sweep_interval: float = 3600, sweep_budget: float = 0.5,
+                             snapshot_interval: float = None):
+        """Register TTL sweeps (and optionally incremental snapshots) with a shared scheduler."""
+        self.scheduler = scheduler or default_scheduler()
+        self.maintenance_tasks = [f"{self.db_path}:sweep"]
+        self.scheduler.add(self.maintenance_tasks[0], self.cleanup_expired_entries, sweep_interval,
+                           budget=sweep_budget, adaptive=True)
+        if snapshot_interval:
+            self.maintenance_tasks.append(f"{self.db_path}:snapshot")
+            self.scheduler.add(self.maintenance_tasks[1], lambda: self.snapshot(incremental=True), snapshot_interval)
+
+    def _token(self, key: str) -> str:
+        """Return the value stored in the 'key' field for a given key."""
+        return key
+
+    def _pack(self, value: any, token: str) -> any:
+        """Convert a value to its stored representation in the record whose stored key is ``token``."""
+        return pack_bytes(value)
+
+    def _unpack(self, stored: any, token: str) -> any:
+        """Convert a stored representation back to its value."""
+        return unpack_bytes(stored)
+
+    def _pack_many(self, values: list, tokens: list) -> list:
+        return [self._pack(value, token) for value, token in zip(values, tokens)]
+
+    def _unpack_many(self, stored: list, tokens: list) -> list:
+        return [self._unpack(item, token) for item, token in zip(stored, tokens)]
+
+    def _make_record(self, key: str, packed: any, seconds: int = None) -> dict:
+        record = {'key': self._token(key), 'value': packed}
+        if seconds is not None:
+            expiration_date = datetime.now() + timedelta(seconds=seconds)
+            record['expiration'] = expiration_date.timestamp()
+        return record
+
+    def _record_key(self, record: dict) -> str:
+        """Return the original key of a stored record."""
+        return record['key']
+
+    def _file_stamp(self):
+        return self.db.storage.generation()
+
+    def _doc_ids(self, token: str) -> list:
+        """Resolve a stored key to document ids through the index checkpoint."""
+        return self.db.storage.doc_ids_for(self.db.default_table_name, token)
+
+    def _lookup(self, token: str) -> list:
+        return [self.db.get(doc_id=doc_id) for doc_id in self._doc_ids(token)]
+
+    def _sync_indexes(self):
+        # Another process may have written the file since the indexes were last maintained
+        if self.indexes and self._file_stamp() != self._index_stamp:
+            self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        records = self.db.all()
+        values = self._unpack_many([record['value'] for record in records], [record['key'] for record in records])
+        for index in self.indexes.values():
+            index.clear()
+        self._index_values([record.doc_id for record in records], values)
+
+    def _index_values(self, doc_ids: list, values: list):
+        for index in self.indexes.values():
+            for doc_id, value in zip(doc_ids, values):
+                index.add(doc_id, value)
+        if self.indexes:
+            self._index_stamp = self._file_stamp()
+
+    def _unindex(self, doc_ids: list):
+        for index in self.indexes.values():
+            for doc_id in doc_ids:
+                index.remove(doc_id)
+        if self.indexes:
+            self._index_stamp = self._file_stamp()
+
+    @contextmanager
+    def _mutating(self):
+        with locked_db(self.db, self.db_lock):
+            self._sync_indexes()
+            yield self.db
+
+    @contextmanager
+    def _reading(self):
+        with shared_db(self.db, self.db_lock):
+            if self.indexes:
+                # Several reader threads may hold the shared lock at once
+                with self._index_lock:
+                    self._sync_indexes()
+            yield self.db
+
+    def create_index(self, field: str) -> bool:
         try:
             with locked_db(self.db, self.db_lock):
-                record = {'key': key, 'value': value}
-                if seconds is not None:
-                    expiration_date = datetime.now() + timedelta(seconds=seconds)
-                    record['expiration'] = expiration_date.timestamp()
-                self.db.insert(record)
+                if field not in self.indexes:
+                    self.indexes[field] = FieldIndex(field)
+                    self._rebuild_indexes()
+                return True
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to create index: {e}")
+        return False
+
+    def drop_index(self, field: str) -> bool:
+        return self.indexes.pop(field, None) is not None
+
+    def _fetch(self, doc_ids: list) -> dict:
+        now = datetime.now().timestamp()
+        # Fetch documents one by one so only the matches are parsed, in the order of doc_ids
+        records = [self.db.get(doc_id=doc_id) for doc_id in doc_ids]
+        records = [record for record in records
+                   if record is not None and ('expiration' not in record or now <= record['expiration'])]
+        values = self._unpack_many([record['value'] for record in records], [record['key'] for record in records])
+        return {self._record_key(record): value for record, value in zip(records, values)}
+
+    def find(self, field: str, value: any) -> dict:
+        try:
+            with self._reading():
+                with self._index_lock:
+                    doc_ids = list(self.indexes[field].find(value))
+                return self._fetch(doc_ids)
+        except KeyError:
+            logger.error(f"No index declared on field: {field}")
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to find entries: {e}")
+        return {}
+
+    def find_range(self, field: str, lo: any = None, hi: any = None) -> dict:
+        try:
+            with self._reading():
+                with self._index_lock:
+                    doc_ids = self.indexes[field].find_range(lo, hi)
+                return self._fetch(doc_ids)
+        except KeyError:
+            logger.error(f"No index declared on field: {field}")
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to find entries: {e}")
+        return {}
+
+    def create(self, key: str, value: any, seconds: int = None) -> bool:
+        try:
+            with self._mutating():
+                doc_id = self.db.insert(self._make_record(key, self._pack(value, self._token(key)), seconds))
+                self._index_values([doc_id], [value])
                 return True
         except Timeout as e:
             logger.error(f"Timeout acquiring database lock: {e}")
@@ -81,33 +261,74 @@ class Storage:
             logger.error(f"Failed to create entry: {e}")
         return False
 
+    def create_many(self, items: dict, seconds: int = None) -> bool:
+        try:
+            keys = list(items)
+            packed = self._pack_many([items[key] for key in keys], [self._token(key) for key in keys])
+            with self._mutating():
+                doc_ids = self.db.insert_multiple(
+                    self._make_record(key, value, seconds) for key, value in zip(keys, packed))
+                self._index_values(doc_ids, [items[key] for key in keys])
+                return True
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to create entries: {e}")
+        return False
+
     def read(self, key: str):
         try:
-            with locked_db(self.db, self.db_lock):
-                Entry = Query()
-                result = self.db.search(Entry.key == key)
-                if result:
-                    entry = result[0]
-                    if 'expiration' in entry and datetime.now().timestamp() > entry['expiration']:
-                        self.db.remove(Entry.key == key)
-                        return None
-                    return entry['value']
+            token = self._token(key)
+            with self._reading():
+                result = self._lookup(token)
+                if not result:
+                    return None
+                entry = result[0]
+                if 'expiration' not in entry or datetime.now().timestamp() <= entry['expiration']:
+                    return self._unpack(entry['value'], entry['key'])
+            # Expired: drop it under an exclusive lock, unless it was refreshed meanwhile
+            with self._mutating():
+                now = datetime.now().timestamp()
+                expired = [record.doc_id for record in self._lookup(token) if record.get('expiration', now) < now]
+                if expired:
+                    self._unindex(self.db.remove(doc_ids=expired))
         except Timeout as e:
             logger.error(f"Timeout acquiring database lock: {e}")
         except Exception as e:
             logger.error(f"Failed to read entry: {e}")
         return None
 
+    def read_many(self, keys: list) -> dict:
+        try:
+            with self._reading():
+                now = datetime.now().timestamp()
+                found = {}
+                for key in keys:
+                    result = self._lookup(self._token(key))
+                    if result and ('expiration' not in result[0] or now <= result[0]['expiration']):
+                        found[key] = result[0]
+            values = self._unpack_many([doc['value'] for doc in found.values()], [doc['key'] for doc in found.values()])
+            return dict(zip(found, values))
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to read entries: {e}")
+        return {}
+
     def update(self, key: str, new_value: any, days: int = None) -> bool:
         try:
-            with locked_db(self.db, self.db_lock):
-                Entry = Query()
-                update_data = {'value': new_value}
+            with self._mutating():
+                token = self._token(key)
+                doc_ids = self._doc_ids(token)
+                if not doc_ids:
+                    return False
+                update_data = {'value': self._pack(new_value, token)}
                 if days is not None:
                     expiration_date = datetime.now() + timedelta(days=days)
                     update_data['expiration'] = expiration_date.timestamp()
-                updated_count = self.db.update(update_data, Entry.key == key)[0]
-                return updated_count > 0
+                doc_ids = self.db.update(update_data, doc_ids=doc_ids)
+                self._index_values(doc_ids, [new_value] * len(doc_ids))
+                return len(doc_ids) > 0
         except Timeout as e:
             logger.error(f"Timeout acquiring database lock: {e}")
         except Exception as e:
@@ -116,10 +337,12 @@ class Storage:
 
     def delete(self, key: str) -> bool:
         try:
-            with locked_db(self.db, self.db_lock):
-                Entry = Query()
-                deleted_count = self.db.remove(Entry.key == key)[0]
-                return deleted_count > 0
+            with self._mutating():
+                doc_ids = self._doc_ids(self._token(key))
+                if not doc_ids:
+                    return False
+                self._unindex(self.db.remove(doc_ids=doc_ids))
+                return True
         except Timeout as e:
             logger.error(f"Timeout acquiring database lock: {e}")
         except Exception as e:
@@ -128,12 +351,13 @@ class Storage:
 
     def increment(self, key: str, amount: int = 1) -> int:
         try:
-            with locked_db(self.db, self.db_lock):
-                Entry = Query()
-                result = self.db.search(Entry.key == key)
+            with self._mutating():
+                result = self._lookup(self._token(key))
                 if result:
-                    new_count = result[0]['value'] + amount
-                    self.db.update({'value': new_count}, Entry.key == key)
+                    token = result[0]['key']
+                    new_count = self._unpack(result[0]['value'], token) + amount
+                    doc_ids = self.db.update({'value': self._pack(new_count, token)}, doc_ids=[result[0].doc_id])
+                    self._index_values(doc_ids, [new_count] * len(doc_ids))
                     return new_count
                 else:
                     # If the key does not exist, create it with the amount
@@ -145,10 +369,37 @@ class Storage:
             logger.error(f"Failed to increment value: {e}")
         return amount
 
+    def records_for(self, keys: list) -> dict:
+        """Stored documents of each key, by stored key, so a mutation can be replayed elsewhere."""
+        with self._reading():
+            return {token: [dict(doc) for doc in self._lookup(token)] for token in map(self._token, keys)}
+
+    def replace_records(self, records: dict) -> bool:
+        """Make ``records[key]`` the exact stored documents of each stored key.
+
+        Documents carry packed values and absolute expirations, so replaying
+        the same call any number of times leaves the store in the same state.
+        """
+        try:
+            with self._mutating():
+                stale = [doc_id for token in records for doc_id in self._doc_ids(token)]
+                if stale:
+                    self._unindex(self.db.remove(doc_ids=stale))
+                docs = [doc for token_docs in records.values() for doc in token_docs]
+                if docs:
+                    doc_ids = self.db.insert_multiple(docs)
+                    self._index_values(doc_ids, self._unpack_many([doc['value'] for doc in docs],
+                                                                  [doc['key'] for doc in docs]))
+                return True
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to replace records: {e}")
+        return False
+
     def keys(self, pattern: str):
         try:
-            with locked_db(self.db, self.db_lock):
-                import fnmatch
+            with self._reading():
                 all_keys = [item['key'] for item in self.db.all()]
                 return fnmatch.filter(all_keys, pattern)
         except Timeout as e:
@@ -157,28 +408,240 @@ class Storage:
             logger.error(f"Failed to retrieve keys: {e}")
         return []
 
-    def cleanup_expired_entries(self):
+    def cleanup_expired_entries(self, budget: float = None, batch_size: int = 1000):
+        """Remove expired entries with a single write.
+
+        The scan runs on the cached view of the file under the shared lock and
+        checks ``budget`` (seconds) between batches of ``batch_size`` documents.
+        A scan cut short by the budget resumes where it stopped on the next run;
+        whatever it found is removed in one write under the exclusive lock.
+        """
+        deadline = None if budget is None else time.monotonic() + budget
+        removed_count = 0
         try:
-            with locked_db(self.db, self.db_lock):
+            expired, scanned, complete = [], 0, True
+            for docs in self.document_batches(batch_size, start=self._sweep_offset):
+                if deadline is not None and time.monotonic() >= deadline:
+                    complete = False
+                    break
                 now = datetime.now().timestamp()
-                Entry = Query()
-                removed_count = self.db.remove(Entry.expiration.test(lambda x: x < now))
-                logger.info(f"Cleaned up {removed_count} expired entries.")
-                return removed_count[0]
+                expired.extend(int(doc_id) for doc_id, doc in docs.items() if doc.get('expiration', now) < now)
+                scanned += len(docs)
+            if expired:
+                with self._mutating():
+                    # Entries may have been removed or refreshed since the scan
+                    now = datetime.now().timestamp()
+                    batch = [self.db.get(doc_id=doc_id) for doc_id in expired]
+                    doc_ids = self.db.remove(doc_ids=[record.doc_id for record in batch
+                                                      if record is not None and record.get('expiration', now) < now])
+                    self._unindex(doc_ids)
+                    removed_count = len(doc_ids)
+            # Removed documents no longer take up positions in the file
+            self._sweep_offset = 0 if complete else self._sweep_offset + scanned - removed_count
+            logger.info(f"Cleaned up {removed_count} expired entries.")
+            return removed_count
         except Timeout as e:
             logger.error(f"Timeout acquiring database lock: {e}")
         except Exception as e:
             logger.error(f"Failed to cleanup expired entries: {e}")
+        return removed_count
+
+    def _rewrite(self, data: dict):
+        # Reopen so TinyDB does not keep document ids cached from before the rewrite
+        self.db.close()
+        self.db = TinyDB(self.db_path, storage=CheckpointedJSONStorage)
+        self.db.storage.write(data)
+
+    def bulk_load(self, records, seconds: int = None, replace: bool = False, batch_size: int = 10000) -> int:
+        """Load ``{'key', 'value'[, 'expiration']}`` records, writing the file once.
+
+        The whole load runs under one exclusive lock: records are packed in
+        batches, indexed as they arrive and the file and its checkpoint are
+        written in a single pass at the end. Loaded keys replace existing
+        entries; with ``replace`` the store is emptied first.
+        """
+        try:
+            with self._mutating():
+                table_name = self.db.default_table_name
+                data = self.db.storage.read() or {}
+                if replace:
+                    for index in self.indexes.values():
+                        index.clear()
+                docs = {} if replace else dict(data.get(table_name, {}))
+                next_id = max(map(int, docs), default=0) + 1
+                existing = {}
+                for doc_id, doc in docs.items():
+                    existing.setdefault(doc['key'], []).append(int(doc_id))
+                loaded = {}
+                for batch in batches(records, batch_size):
+                    tokens = [self._token(record['key']) for record in batch]
+                    packed = self._pack_many([record['value'] for record in batch], tokens)
+                    for record, value, token in zip(batch, packed, tokens):
+                        stale = [loaded[token]] if token in loaded else existing.pop(token, [])
+                        for doc_id in stale:
+                            docs.pop(str(doc_id), None)
+                            for index in self.indexes.values():
+                                index.remove(doc_id)
+                        doc = self._make_record(record['key'], value, seconds)
+                        if seconds is None and record.get('expiration') is not None:
+                            doc['expiration'] = record['expiration']
+                        docs[str(next_id)] = doc
+                        loaded[token] = next_id
+                        for index in self.indexes.values():
+                            index.add(next_id, record['value'])
+                        next_id += 1
+                data[table_name] = docs
+                self._rewrite(data)
+                if self.indexes:
+                    self._index_stamp = self._file_stamp()
+                logger.info(f"Bulk loaded {len(loaded)} entries into {self.label}")
+                return len(loaded)
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to bulk load entries: {e}")
         return 0
 
+    def document_batches(self, batch_size: int = 1000, start: int = 0):
+        """Return an iterator over the stored documents as of this call, ``batch_size`` at a time.
+
+        Each batch maps document ids to documents, skipping the first ``start``
+        documents. The lock is only held to grab the cached view of the file,
+        which later writes replace rather than modify. Documents are parsed one
+        batch at a time, so memory use does not grow with the store.
+        """
+        with self._reading():
+            table = (self.db.storage.read() or {}).get(self.db.default_table_name, {})
+        doc_ids = itertools.islice(table, start, None)
+        return ({doc_id: table[doc_id] for doc_id in batch} for batch in batches(doc_ids, batch_size))
+
+    def iter_records(self, batch_size: int = 1000):
+        """Yield live entries as ``{'key', 'value'[, 'expiration']}`` records."""
+        for docs in self.document_batches(batch_size):
+            now = datetime.now().timestamp()
+            docs = [doc for doc in docs.values() if doc.get('expiration', now) >= now]
+            values = self._unpack_many([doc['value'] for doc in docs], [doc['key'] for doc in docs])
+            for doc, value in zip(docs, values):
+                record = {'key': self._record_key(doc), 'value': value}
+                if 'expiration' in doc:
+                    record['expiration'] = doc['expiration']
+                yield record
+
+    def export(self, stream, format: str = 'jsonl', batch_size: int = 1000) -> int:
+        """Stream live entries to a binary stream. Returns the number of records written."""
+        # Deferred: core.bulk builds on this module
+        from core.bulk import write_records
+        try:
+            return write_records(stream, self.iter_records(batch_size), format)
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to export entries: {e}")
+        return 0
+
+    def snapshot(self, incremental: bool = False, **metadata) -> dict:
+        """Take a point-in-time snapshot, holding the lock only while the cached file image is grabbed."""
+        try:
+            with shared_db(self.db, self.db_lock):
+                raw = self.db.storage.read_raw()
+            return self.snapshots.write(raw, incremental=incremental, **metadata)
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to take snapshot: {e}")
+        return {}
+
+    def list_snapshots(self) -> list:
+        return self.snapshots.list()
+
+    def restore(self, snapshot_id: str = None) -> bool:
+        try:
+            data = self.snapshots.load(snapshot_id)
+            with locked_db(self.db, self.db_lock):
+                self._rewrite(data)
+                self._rebuild_indexes()
+                return True
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to restore snapshot: {e}")
+        return False
+
     def shutdown(self):
         logger.info("Shutdown signal received")
-        if getattr(self, 'cleanup_thread', None):
-            if self.cleanup_thread.is_alive():
-                self.cleanup_thread.stop()
+        # remove() waits for a run in progress, so no sweep or snapshot outlives the store
+        for name in getattr(self, 'maintenance_tasks', []):
+            self.scheduler.remove(name)
         self.db.close()
 
 
+class EncryptedStorage(Storage):
+    """Storage that encrypts values at rest, and optionally keys.
+
+    Values are JSON-encoded, encrypted with AES and stored as base64 text. When
+    ``encrypt_keys`` is set, the ``key`` field holds a deterministic HMAC token so
+    indexed lookups still work, and the encrypted key is kept alongside for ``keys``.
+    """
+
+    def __init__(self, label: str, cache_path: str, encrypt_keys: bool = False, crypto_manager=None,
+                 indexes: list = None, shared_reads: bool = False):
+        self.encrypt_keys = encrypt_keys
+        if crypto_manager is None:
+            # Deferred so plaintext stores never pay for importing cryptography and keyring
+            from utils.crypto import CryptoManager
+            crypto_manager = CryptoManager()
+        self.crypto = crypto_manager
+        super().__init__(label, cache_path, indexes=indexes, shared_reads=shared_reads)
+
+    def _token(self, key: str) -> str:
+        return self.crypto.token(key) if self.encrypt_keys else key
+
+    # The stored key is passed as associated data, so a ciphertext only decrypts in the record it was written for
+    def _pack(self, value: any, token: str) -> str:
+        encrypted = self.crypto.encrypt_bytes(json.dumps(pack_bytes(value)).encode(), token.encode())
+        return base64.b64encode(encrypted).decode()
+
+    def _unpack(self, stored: str, token: str) -> any:
+        return unpack_bytes(json.loads(self.crypto.decrypt_bytes(base64.b64decode(stored), token.encode())))
+
+    def _pack_many(self, values: list, tokens: list) -> list:
+        encrypted = self.crypto.encrypt_many([json.dumps(pack_bytes(value)).encode() for value in values],
+                                             [token.encode() for token in tokens])
+        return [base64.b64encode(item).decode() for item in encrypted]
+
+    def _unpack_many(self, stored: list, tokens: list) -> list:
+        decrypted = self.crypto.decrypt_many([base64.b64decode(item) for item in stored],
+                                             [token.encode() for token in tokens])
+        return [unpack_bytes(json.loads(item)) for item in decrypted]
+
+    def _record_key(self, record: dict) -> str:
+        if self.encrypt_keys:
+            return self.crypto.decrypt_bytes(base64.b64decode(record['ekey']), record['key'].encode()).decode()
+        return record['key']
+
+    def _make_record(self, key: str, packed: any, seconds: int = None) -> dict:
+        record = super()._make_record(key, packed, seconds)
+        if self.encrypt_keys:
+            record['ekey'] = base64.b64encode(self.crypto.encrypt_bytes(key.encode(), record['key'].encode())).decode()
+        return record
+
+    def keys(self, pattern: str):
+        if not self.encrypt_keys:
+            return super().keys(pattern)
+        try:
+            with self._reading():
+                records = self.db.all()
+            encrypted_keys = [base64.b64decode(record['ekey']) for record in records]
+            tokens = [record['key'].encode() for record in records]
+            all_keys = [key.decode() for key in self.crypto.decrypt_many(encrypted_keys, tokens)]
+            return fnmatch.filter(all_keys, pattern)
+        except Timeout as e:
+            logger.error(f"Timeout acquiring database lock: {e}")
+        except Exception as e:
+            logger.error(f"Failed to retrieve keys: {e}")
+        return []
+
+
 class NASPathStorage(Storage):
     def __init__(self, label, cache_path):
         super().__init__(label, cache_path)
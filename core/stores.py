@@ -1,32 +1,272 @@
+import os
+import threading
+import time
+import uuid
+
 import Pyro5.api
 
-from core.storage import Storage
+from core.client import available_serializers, from_wire
+from core.config import logger
+from core.memory import MemoryStorage
+from core.replication import MutationLog, ReplicationClient
+from core.storage import Storage, EncryptedStorage, shared_db
+
+
+def _snapshot_stream(seq, documents):
+    # Always yield at least one batch so empty stores still report their sequence number
+    yield {'seq': seq, 'records': []}
+    for batch in documents:
+        yield {'seq': seq, 'records': list(batch.values())}
 
 
+@Pyro5.api.expose
 class KeyValueServer:
-    def __init__(self, label, cache_path):
-        self.kv_storage = Storage(label, cache_path)
+    def __init__(self, label, cache_path, encrypted=False, encrypt_keys=False, replicate=False, indexes=None,
+                 memory=False, max_entries=None, snapshot_interval=None, load_timeout=None, max_load_records=None):
+        if memory:
+            if replicate or encrypted:
+                raise ValueError("Memory stores support neither replication nor encryption")
+            self.kv_storage = MemoryStorage(label, cache_path, indexes=indexes, max_entries=max_entries,
+                                            snapshot_interval=snapshot_interval)
+        elif encrypted:
+            self.kv_storage = EncryptedStorage(label, cache_path, encrypt_keys=encrypt_keys, indexes=indexes)
+        else:
+            self.kv_storage = Storage(label, cache_path, indexes=indexes)
+        self.mutation_log = MutationLog(f"{self.kv_storage.db_path}.log") if replicate else None
+        self.mutation_lock = threading.Lock()
+        self.loads = {}
+        self.loads_lock = threading.Lock()
+        # Staged loads left idle this long are treated as abandoned by a dead client
+        self.load_timeout = float(load_timeout or os.getenv('KVSTORE_LOAD_TIMEOUT', 600))
+        self.max_load_records = int(max_load_records or os.getenv('KVSTORE_MAX_LOAD_RECORDS', 1000000))
+
+    def _mutate(self, op, *args):
+        if self.mutation_log is None:
+            return getattr(self.kv_storage, op)(*args)
+        # Serialise mutations so the log order matches the order they were applied in
+        with self.mutation_lock:
+            result = getattr(self.kv_storage, op)(*args)
+            if result is not False:
+                # Log the resulting documents rather than the call: relative TTLs and
+                # increments would not replay deterministically or idempotently
+                keys = list(args[0]) if op == 'create_many' else [args[0]]
+                self.mutation_log.append('replace_records', self.kv_storage.records_for(keys))
+            return result
+
+    def serializers(self):
+        return available_serializers()
 
     def create(self, key, value, seconds=None):
-        return self.kv_storage.create(key, value, seconds)
+        return self._mutate('create', key, from_wire(value), seconds)
+
+    def create_many(self, items, seconds=None):
+        return self._mutate('create_many', {key: from_wire(value) for key, value in items.items()}, seconds)
 
     def read(self, key):
         return self.kv_storage.read(key)
 
+    def read_many(self, keys):
+        return self.kv_storage.read_many(keys)
+
     def update(self, key, new_value, days=None):
-        return self.kv_storage.update(key, new_value, days)
+        return self._mutate('update', key, from_wire(new_value), days)
 
     def delete(self, key):
-        return self.kv_storage.delete(key)
+        return self._mutate('delete', key)
 
     def increment(self, key, amount=1):
-        return self.kv_storage.increment(key, amount)
+        return self._mutate('increment', key, amount)
 
     def keys(self, pattern):
         return self.kv_storage.keys(pattern)
 
+    def create_index(self, field):
+        return self.kv_storage.create_index(field)
+
+    def find(self, field, value):
+        return self.kv_storage.find(field, value)
+
+    def find_range(self, field, lo=None, hi=None):
+        return self.kv_storage.find_range(field, lo, hi)
+
+    def bulk_load(self, records, seconds=None, replace=False):
+        records = ({**record, 'value': from_wire(record['value'])} for record in records)
+        with self.mutation_lock:
+            loaded = self.kv_storage.bulk_load(records, seconds, replace)
+            if loaded and self.mutation_log is not None:
+                # Too large to replay entry by entry: replicas resynchronise from a snapshot
+                self.mutation_log.reset()
+            return loaded
+
+    def _expire_loads(self):
+        """Drop staged loads that have been idle for longer than the load timeout. Caller holds loads_lock."""
+        cutoff = time.monotonic() - self.load_timeout
+        for load_id in [load_id for load_id, load in self.loads.items() if load['touched'] < cutoff]:
+            logger.warning(f"Discarding abandoned bulk load {load_id}")
+            del self.loads[load_id]
+
+    def bulk_load_begin(self, seconds=None, replace=False):
+        """Start a load whose records arrive over several calls and are written in one pass on commit.
+
+        Loads not appended to or committed within ``load_timeout`` seconds are
+        discarded, and a load may stage at most ``max_load_records`` records.
+        """
+        load_id = uuid.uuid4().hex
+        with self.loads_lock:
+            self._expire_loads()
+            self.loads[load_id] = {'records': [], 'seconds': seconds, 'replace': replace,
+                                   'touched': time.monotonic()}
+        return load_id
+
+    def bulk_load_append(self, load_id, records):
+        with self.loads_lock:
+            self._expire_loads()
+            load = self.loads.get(load_id)
+            if load is None:
+                raise KeyError(f"Unknown or expired bulk load {load_id}")
+            load['touched'] = time.monotonic()
+            if len(load['records']) + len(records) > self.max_load_records:
+                del self.loads[load_id]
+                raise ValueError(f"Bulk load {load_id} exceeds {self.max_load_records} records and was discarded")
+        load['records'].extend({**record, 'value': from_wire(record['value'])} for record in records)
+        return len(load['records'])
+
+    def bulk_load_commit(self, load_id):
+        with self.loads_lock:
+            self._expire_loads()
+            load = self.loads.pop(load_id, None)
+        if load is None:
+            raise KeyError(f"Unknown or expired bulk load {load_id}")
+        with self.mutation_lock:
+            loaded = self.kv_storage.bulk_load(load['records'], load['seconds'], load['replace'])
+            if loaded and self.mutation_log is not None:
+                self.mutation_log.reset()
+            return loaded
+
+    def bulk_load_abort(self, load_id):
+        with self.loads_lock:
+            return self.loads.pop(load_id, None) is not None
+
+    def export(self, batch_size=1000):
+        # Pyro streams generators to the client item by item
+        return self.kv_storage.iter_records(batch_size)
+
+    def replication_log(self, since, limit=1000):
+        if self.mutation_log is None:
+            raise RuntimeError("Replication is not enabled on this server")
+        with self.mutation_lock:
+            return {
+                'seq': self.mutation_log.seq,
+                'start': self.mutation_log.start,
+                'entries': self.mutation_log.since(since, limit),
+            }
+
+    def replication_snapshot(self, batch_size=1000):
+        if self.mutation_log is None:
+            raise RuntimeError("Replication is not enabled on this server")
+        with self.mutation_lock:
+            seq = self.mutation_log.seq
+            documents = self.kv_storage.document_batches(batch_size)
+        # Streamed by Pyro one batch at a time, without holding up writes on the primary
+        return _snapshot_stream(seq, documents)
+
+    def snapshot(self, incremental=False):
+        if self.mutation_log is None:
+            return self.kv_storage.snapshot(incremental)
+        # Record the log offset the snapshot corresponds to
+        with self.mutation_lock, shared_db(self.kv_storage.db, self.kv_storage.db_lock):
+            raw = self.kv_storage.db.storage.read_raw()
+            seq = self.mutation_log.seq
+        return self.kv_storage.snapshots.write(raw, incremental=incremental, seq=seq)
+
+    def list_snapshots(self):
+        return self.kv_storage.list_snapshots()
+
+    def restore(self, snapshot_id=None):
+        with self.mutation_lock:
+            restored = self.kv_storage.restore(snapshot_id)
+            if restored and self.mutation_log is not None:
+                self.mutation_log.reset()
+            return restored
+
     def start_cleanup(self):
         self.kv_storage.start_cleanup_thread()
 
+    def maintenance_stats(self):
+        tasks = getattr(self.kv_storage, 'maintenance_tasks', [])
+        if not tasks:
+            return {}
+        stats = self.kv_storage.scheduler.stats()
+        return {name: stats[name] for name in tasks if name in stats}
+
+    def shutdown(self):
+        self.kv_storage.shutdown()
+
+
+@Pyro5.api.expose
+class ReplicaServer(KeyValueServer):
+    """Read-only server that follows a primary's mutation log.
+
+    Reads are served from a local copy of the store. When ``max_lag_seconds``
+    is set, reads fail once the replica has not been caught up for longer than
+    that, so clients can fall back to the primary.
+    """
+
+    def __init__(self, label, cache_path, primary_uri, encrypted=False, encrypt_keys=False, indexes=None,
+                 interval=None, max_lag_seconds=None):
+        super().__init__(label, cache_path, encrypted=encrypted, encrypt_keys=encrypt_keys, indexes=indexes)
+        if interval is None:
+            interval = float(os.getenv('KVSTORE_REPLICA_INTERVAL', 0.5))
+        self.max_lag_seconds = max_lag_seconds
+        self.replication = ReplicationClient(self.kv_storage, primary_uri, interval=interval)
+        self.replication.start()
+
+    def _check_lag(self):
+        if self.max_lag_seconds is None:
+            return
+        lag = self.replication.status()['lag_seconds']
+        if lag is None or lag > self.max_lag_seconds:
+            raise RuntimeError(f"Replica lag {lag} exceeds bound of {self.max_lag_seconds}s")
+
+    def _mutate(self, op, *args):
+        raise RuntimeError("Replica is read-only; send writes to the primary")
+
+    def restore(self, snapshot_id=None):
+        raise RuntimeError("Replica is read-only; restore on the primary")
+
+    def bulk_load(self, records, seconds=None, replace=False):
+        raise RuntimeError("Replica is read-only; send writes to the primary")
+
+    def bulk_load_begin(self, seconds=None, replace=False):
+        raise RuntimeError("Replica is read-only; send writes to the primary")
+
+    def read(self, key):
+        self._check_lag()
+        return super().read(key)
+
+    def read_many(self, keys):
+        self._check_lag()
+        return super().read_many(keys)
+
+    def keys(self, pattern):
+        self._check_lag()
+        return super().keys(pattern)
+
+    def find(self, field, value):
+        self._check_lag()
+        return super().find(field, value)
+
+    def find_range(self, field, lo=None, hi=None):
+        self._check_lag()
+        return super().find_range(field, lo, hi)
+
+    def export(self, batch_size=1000):
+        self._check_lag()
+        return super().export(batch_size)
+
+    def replication_status(self):
+        return self.replication.status()
+
     def shutdown(self):
-        self.kv_storage.shutdown()
\ No newline at end of file
+        self.replication.stop()
+        super().shutdown()
@@ -0,0 +1,146 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from core.bulk import main, read_records, write_records
+from core.checkpoint import CheckpointedJSONStorage
+from core.client import connect
+from core.memory import MemoryStorage
+from core.storage import Storage, NASPathStorage
+from core.stores import KeyValueServer
+from tests.helpers import ServerTestCase
+
+
+class TestRecordFormats(unittest.TestCase):
+    def test_round_trip(self):
+        """Test that both formats round trip records, including bytes values."""
+        records = [{'key': 'a', 'value': {'path': '/mnt/a'}}, {'key': 'b', 'value': b"\x00\x01", 'expiration': 1.5}]
+        for format in ('jsonl', 'msgpack'):
+            with self.subTest(format=format):
+                stream = io.BytesIO()
+                self.assertEqual(write_records(stream, records, format), 2)
+                stream.seek(0)
+                self.assertEqual(list(read_records(stream, format)), records)
+
+
+class TestBulkLoad(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.storage = Storage("test_bulk", self.cache_path, indexes=['owner'])
+
+    def test_load_and_export(self):
+        """Test loading records in one pass and exporting them back."""
+        records = ({'key': f"key_{i}", 'value': {'owner': f"user_{i % 3}", 'id': i}} for i in range(300))
+        self.assertEqual(self.storage.bulk_load(records, batch_size=64), 300)
+        self.assertEqual(self.storage.read("key_42"), {'owner': 'user_0', 'id': 42})
+        self.assertEqual(len(self.storage.find('owner', 'user_1')), 100)
+        self.storage.create("key_300", {'owner': 'user_0', 'id': 300})
+        self.assertEqual(len(self.storage.keys("key_*")), 301)
+
+        stream = io.BytesIO()
+        self.assertEqual(self.storage.export(stream, batch_size=64), 301)
+        stream.seek(0)
+        exported = {record['key']: record['value'] for record in read_records(stream)}
+        self.assertEqual(exported["key_300"], {'owner': 'user_0', 'id': 300})
+
+    def test_loaded_keys_replace_entries(self):
+        """Test that loaded keys replace existing entries and duplicates in the input."""
+        self.storage.create_many({"a": {'owner': 'old'}, "b": {'owner': 'old'}})
+        records = [{'key': 'a', 'value': {'owner': 'first'}}, {'key': 'a', 'value': {'owner': 'new'}}]
+        self.assertEqual(self.storage.bulk_load(records), 1)
+        self.assertEqual(self.storage.read("a"), {'owner': 'new'})
+        self.assertEqual(self.storage.read("b"), {'owner': 'old'})
+        self.assertEqual(set(self.storage.find('owner', 'old')), {"b"})
+        self.assertEqual(self.storage.find('owner', 'first'), {})
+
+        self.assertEqual(self.storage.bulk_load([{'key': 'c', 'value': {'owner': 'new'}}], replace=True), 1)
+        self.assertEqual(sorted(self.storage.keys("*")), ["c"])
+        self.assertEqual(self.storage.find('owner', 'old'), {})
+
+    def test_expiration(self):
+        """Test that expirations are kept on load and expired entries are not exported."""
+        records = [{'key': 'gone', 'value': 1, 'expiration': time.time() - 1}, {'key': 'kept', 'value': 2}]
+        self.storage.bulk_load(records)
+        self.assertEqual([record['key'] for record in self.storage.iter_records()], ["kept"])
+        self.assertEqual(self.storage.cleanup_expired_entries(), 1)
+
+    def test_memory_storage(self):
+        """Test the same operations on the memory backend."""
+        storage = MemoryStorage("test_bulk_memory", self.cache_path)
+        self.assertEqual(storage.bulk_load({'key': f"key_{i}", 'value': i} for i in range(10)), 10)
+        stream = io.BytesIO()
+        self.assertEqual(storage.export(stream, 'msgpack'), 10)
+        stream.seek(0)
+        self.assertEqual(len(list(read_records(stream, 'msgpack'))), 10)
+
+    def test_cli(self):
+        """Test seeding a NASPathStorage label from a file with the CLI."""
+        path = os.path.join(self.cache_path, "paths.jsonl")
+        with open(path, 'wb') as f:
+            write_records(f, ({'key': f"app_env{i}_linux", 'value': f"/mnt/nas/{i}"} for i in range(50)))
+        self.assertEqual(main(['load', 'nas', path, '--cache-path', self.cache_path]), 50)
+        storage = NASPathStorage("nas", self.cache_path)
+        self.assertEqual(storage.read_path("app", "env7", "linux"), "/mnt/nas/7")
+        storage.shutdown()
+        self.assertEqual(main(['export', 'nas', path, '--cache-path', self.cache_path, '--format', 'msgpack']), 50)
+
+    def tearDown(self):
+        self.storage.shutdown()
+        shutil.rmtree(self.cache_path)
+
+
+class TestBulkServer(ServerTestCase):
+    label = "test_bulk_server"
+
+    def test_staged_load_writes_once(self):
+        """Test that a load staged over several calls writes the store file a single time."""
+        server = KeyValueServer("test_staged", self.cache_path, indexes=['n'])
+        load_id = server.bulk_load_begin()
+        write = CheckpointedJSONStorage.write
+        with patch.object(CheckpointedJSONStorage, 'write', autospec=True, side_effect=write) as writes:
+            for start in range(0, 30, 10):
+                batch = [{'key': f"key_{i}", 'value': {'n': i}} for i in range(start, start + 10)]
+                server.bulk_load_append(load_id, batch)
+            self.assertEqual(server.bulk_load_commit(load_id), 30)
+        self.assertEqual(writes.call_count, 1)
+        self.assertEqual(server.find('n', 29), {"key_29": {'n': 29}})
+        self.assertFalse(server.bulk_load_abort(load_id))
+        server.shutdown()
+
+    def test_abandoned_and_oversized_loads_are_dropped(self):
+        """Test that idle loads expire and that a load cannot stage more than its cap."""
+        server = KeyValueServer("test_staged_limits", self.cache_path, load_timeout=0.05, max_load_records=15)
+        abandoned = server.bulk_load_begin()
+        server.bulk_load_append(abandoned, [{'key': 'a', 'value': 1}])
+        time.sleep(0.1)
+        active = server.bulk_load_begin()
+        self.assertEqual(list(server.loads), [active])
+        with self.assertRaises(KeyError):
+            server.bulk_load_commit(abandoned)
+
+        batch = [{'key': f"key_{i}", 'value': i} for i in range(10)]
+        server.bulk_load_append(active, batch)
+        with self.assertRaises(ValueError):
+            server.bulk_load_append(active, batch)
+        self.assertEqual(server.loads, {})
+        server.shutdown()
+
+    def test_load_and_export_through_server(self):
+        """Test batched loads and streamed exports through the CLI and a server."""
+        path = os.path.join(self.cache_path, "entries.jsonl")
+        with open(path, 'wb') as f:
+            write_records(f, ({'key': f"key_{i}", 'value': os.urandom(8)} for i in range(25)))
+        args = ['--uri', self.uri, '--batch-size', '10', '--cache-path', self.cache_path]
+        self.assertEqual(main(['load', 'test_bulk_server', path, '--replace'] + args), 25)
+        self.assertEqual(len(connect(self.uri).keys("key_*")), 25)
+        self.assertEqual(main(['export', 'test_bulk_server', path] + args), 25)
+        with open(path, 'rb') as f:
+            self.assertTrue(all(isinstance(record['value'], bytes) for record in read_records(f)))
+
+
+if __name__ == '__main__':
+    unittest.main()
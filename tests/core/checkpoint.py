@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+
+from core.checkpoint import CheckpointedJSONStorage, LazyTable
+from core.storage import Storage
+
+
+class TestCheckpointedJSONStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "test.db")
+
+    def test_file_stays_tinydb_compatible(self):
+        """Test that files written with a checkpoint can be read by plain TinyDB."""
+        db = TinyDB(self.path, storage=CheckpointedJSONStorage)
+        db.insert_multiple([{'key': 'a', 'value': "é"}, {'key': 'b', 'value': {'n': 1}}])
+        db.close()
+        plain = TinyDB(self.path, storage=JSONStorage)
+        self.assertEqual([doc['key'] for doc in plain.all()], ['a', 'b'])
+        plain.close()
+
+    def test_reopen_uses_checkpoint_lazily(self):
+        """Test that reopening loads the checkpoint without parsing documents."""
+        db = TinyDB(self.path, storage=CheckpointedJSONStorage)
+        db.insert_multiple({'key': f"key_{i}", 'value': i} for i in range(10))
+        db.close()
+        storage = CheckpointedJSONStorage(self.path)
+        table = storage.read()['_default']
+        self.assertIsInstance(table, LazyTable)
+        self.assertEqual(storage.doc_ids_for('_default', 'key_3'), [4])
+        self.assertEqual(table['4'], {'key': 'key_3', 'value': 3})
+        storage.close()
+
+    def test_legacy_file_gets_checkpoint(self):
+        """Test that a file written by plain TinyDB is indexed, and checkpointed on the next write."""
+        with open(self.path, 'w') as f:
+            json.dump({'_default': {'1': {'key': 'a', 'value': 1}}}, f)
+        db = TinyDB(self.path, storage=CheckpointedJSONStorage)
+        self.assertEqual(db.storage.doc_ids_for('_default', 'a'), [1])
+        self.assertFalse(os.path.exists(f"{self.path}.idx"))
+        db.insert({'key': 'b', 'value': 2})
+        self.assertTrue(os.path.exists(f"{self.path}.idx"))
+        db.close()
+
+    def test_detects_writes_from_other_handles(self):
+        """Test that a write through another handle invalidates the cached view."""
+        first = TinyDB(self.path, storage=CheckpointedJSONStorage)
+        second = TinyDB(self.path, storage=CheckpointedJSONStorage)
+        first.insert({'key': 'a', 'value': 1})
+        self.assertEqual(second.storage.doc_ids_for('_default', 'a'), [1])
+        first.update({'value': 2}, doc_ids=[1])
+        self.assertEqual(second.get(doc_id=1)['value'], 2)
+        first.close()
+        second.close()
+
+    def test_read_raw_survives_later_writes(self):
+        """Test that the raw image matches the file and is not changed by later writes."""
+        db = TinyDB(self.path, storage=CheckpointedJSONStorage)
+        self.assertEqual(db.storage.read_raw(), b'')
+        db.insert({'key': 'a', 'value': 1})
+        raw = db.storage.read_raw()
+        with open(self.path, 'rb') as f:
+            self.assertEqual(raw, f.read())
+        db.insert({'key': 'b', 'value': 2})
+        self.assertEqual(json.loads(raw), {'_default': {'1': {'key': 'a', 'value': 1}}})
+        db.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+
+class TestStorageColdStart(unittest.TestCase):
+    def test_reopened_storage_reads_through_checkpoint(self):
+        """Test that a reopened Storage serves reads and writes."""
+        cache_path = tempfile.mkdtemp()
+        try:
+            storage = Storage("test_cold_start", cache_path)
+            storage.create_many({f"key_{i}": {"n": i} for i in range(50)})
+            storage.shutdown()
+            reopened = Storage("test_cold_start", cache_path)
+            self.assertEqual(reopened.read("key_42"), {"n": 42})
+            self.assertTrue(reopened.update("key_42", "changed"))
+            self.assertEqual(reopened.read_many(["key_42", "key_7"]), {"key_42": "changed", "key_7": {"n": 7}})
+            reopened.shutdown()
+        finally:
+            shutil.rmtree(cache_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import base64
+import unittest
+import os
+
+from cryptography.exceptions import InvalidTag
+
+from core.storage import EncryptedStorage
+from utils.crypto import CryptoManager
+from tests.helpers import remove_store_files
+
+
+class TestEncryptedStorage(unittest.TestCase):
+    def setUp(self):
+        # Use an explicit key so the tests never touch the system keyring
+        self.crypto = CryptoManager(username="testuser", key=os.urandom(32))
+        self.storage = EncryptedStorage("test_encrypted_storage", "cache", crypto_manager=self.crypto)
+
+    def test_value_is_not_stored_in_plaintext(self):
+        """Test that the raw database file does not contain the value."""
+        self.storage.create("secret", {"password": "hunter2"})
+        with open(self.storage.db_path) as f:
+            self.assertNotIn("hunter2", f.read())
+        self.assertEqual(self.storage.read("secret"), {"password": "hunter2"})
+
+    def test_update_and_increment(self):
+        """Test that update and increment work on encrypted values."""
+        self.storage.create("counter", 1)
+        self.assertEqual(self.storage.increment("counter", 2), 3)
+        self.assertTrue(self.storage.update("counter", 10))
+        self.assertEqual(self.storage.read("counter"), 10)
+
+    def test_batch_operations(self):
+        """Test creating and reading entries in bulk."""
+        items = {f"key_{i}": [i, str(i)] for i in range(20)}
+        self.assertTrue(self.storage.create_many(items))
+        self.assertEqual(self.storage.read_many(list(items) + ["missing"]), items)
+
+    def test_tampering_is_detected(self):
+        """Test that a value altered in the file is rejected instead of decrypted to garbage."""
+        self.storage.create("secret", "value")
+        stored = base64.b64decode(self.storage.db.all()[0]['value'])
+        tampered = stored[:-1] + bytes([stored[-1] ^ 1])
+        self.storage.db.update({'value': base64.b64encode(tampered).decode()})
+        self.assertIsNone(self.storage.read("secret"))
+        with self.assertRaises(InvalidTag):
+            self.crypto.decrypt_bytes(tampered, b"secret")
+
+    def test_values_are_bound_to_their_records(self):
+        """Test that a ciphertext moved to another record is rejected rather than read as that record's value."""
+        self.storage.create_many({"alice": {"role": "user"}, "bob": {"role": "admin"}})
+        alice, bob = self.storage.db.all()
+        self.storage.db.update({'value': bob['value']}, doc_ids=[alice.doc_id])
+        self.storage.db.update({'value': alice['value']}, doc_ids=[bob.doc_id])
+        self.assertIsNone(self.storage.read("alice"))
+        self.assertEqual(self.storage.read_many(["alice", "bob"]), {})
+
+    def test_encrypted_keys(self):
+        """Test that keys are replaced by lookup tokens but remain queryable."""
+        storage = EncryptedStorage("test_encrypted_keys", "cache", encrypt_keys=True, crypto_manager=self.crypto)
+        try:
+            storage.create("user_alice", "a")
+            storage.create("user_bob", "b")
+            storage.create("group_admins", "g")
+            with open(storage.db_path) as f:
+                self.assertNotIn("user_alice", f.read())
+            self.assertEqual(storage.read("user_alice"), "a")
+            self.assertEqual(sorted(storage.keys("user_*")), ["user_alice", "user_bob"])
+            self.assertTrue(storage.delete("user_bob"))
+            self.assertIsNone(storage.read("user_bob"))
+        finally:
+            storage.shutdown()
+            remove_store_files(storage)
+
+    def tearDown(self):
+        self.storage.shutdown()
+        remove_store_files(self.storage)
+
+
+if __name__ == '__main__':
+    unittest.main()
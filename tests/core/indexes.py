@@ -0,0 +1,80 @@
+import unittest
+
+from core.indexes import FieldIndex
+from core.storage import Storage
+from tests.helpers import remove_store_files
+
+
+class TestFieldIndex(unittest.TestCase):
+    def test_find_and_range(self):
+        """Test exact and range lookups on a nested field."""
+        index = FieldIndex("value.meta.size")
+        for doc_id, size in enumerate([5, 1, 3, "big", 3], start=1):
+            index.add(doc_id, {"meta": {"size": size}})
+        index.add(6, {"meta": {}})
+        self.assertEqual(index.find(3), {3, 5})
+        self.assertEqual(index.find_range(2, 5), [3, 5, 1])
+        self.assertEqual(index.find_range(lo=4), [1])
+        self.assertEqual(index.find_range(hi="z"), [4])
+        index.remove(3)
+        self.assertEqual(index.find(3), {5})
+
+    def test_types_are_kept_apart(self):
+        """Test that booleans never match numbers and that mixed-type ranges span types in order."""
+        index = FieldIndex("flag")
+        for doc_id, flag in enumerate([True, 1, 0, False, 1.0, "a", "b"], start=1):
+            index.add(doc_id, {"flag": flag})
+        self.assertEqual(index.find(True), {1})
+        self.assertEqual(index.find(1), {2, 5})
+        self.assertEqual(index.find(False), {4})
+        self.assertEqual(index.find_range(hi=True), [4, 1])
+        self.assertEqual(index.find_range(1, "a"), [2, 5, 6])
+        self.assertEqual(index.find_range("a", 1), [])
+        index.remove(2)
+        self.assertEqual(index.find(1), {5})
+
+
+class TestStorageIndexes(unittest.TestCase):
+    def setUp(self):
+        self.storage = Storage("test_indexes", "cache", indexes=["value.owner", "value.priority"])
+        self.storage.create("job_1", {"owner": "alice", "priority": 1})
+        self.storage.create("job_2", {"owner": "bob", "priority": 5})
+        self.storage.create("job_3", {"owner": "alice", "priority": 3})
+
+    def test_find(self):
+        """Test finding entries by an indexed field."""
+        self.assertEqual(set(self.storage.find("value.owner", "alice")), {"job_1", "job_3"})
+        self.assertEqual(self.storage.find("value.owner", "carol"), {})
+
+    def test_find_range(self):
+        """Test finding entries whose field falls in a range."""
+        self.assertEqual(list(self.storage.find_range("value.priority", 2, 5)), ["job_3", "job_2"])
+
+    def test_index_follows_mutations(self):
+        """Test that updates, deletes and batch inserts keep the index current."""
+        self.storage.update("job_1", {"owner": "bob", "priority": 1})
+        self.storage.delete("job_2")
+        self.storage.create_many({"job_4": {"owner": "bob"}, "job_5": "not a dict"})
+        self.assertEqual(set(self.storage.find("value.owner", "bob")), {"job_1", "job_4"})
+        self.assertEqual(list(self.storage.find("value.owner", "alice")), ["job_3"])
+
+    def test_index_sees_other_writers(self):
+        """Test that changes written by another Storage instance are picked up."""
+        other = Storage("test_indexes", "cache")
+        other.create("job_6", {"owner": "alice", "priority": 9})
+        other.db.close()
+        self.assertEqual(set(self.storage.find("value.owner", "alice")), {"job_1", "job_3", "job_6"})
+
+    def test_unknown_field(self):
+        """Test that querying an undeclared field returns nothing."""
+        self.assertEqual(self.storage.find("value.missing", 1), {})
+        self.assertTrue(self.storage.create_index("value.status"))
+        self.assertEqual(self.storage.find("value.status", 1), {})
+
+    def tearDown(self):
+        self.storage.shutdown()
+        remove_store_files(self.storage)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from filelock import Timeout
+
+from core.locks import ReadWriteFileLock
+from core.storage import Storage
+
+
+class TestReadWriteFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "test.lock")
+
+    def hold(self, shared, acquired, release):
+        lock = ReadWriteFileLock(self.path)
+        lock.acquire_shared() if shared else lock.acquire()
+        acquired.set()
+        release.wait(5)
+        lock.release()
+
+    def start_holder(self, shared):
+        acquired, release = threading.Event(), threading.Event()
+        thread = threading.Thread(target=self.hold, args=(shared, acquired, release))
+        thread.start()
+        self.assertTrue(acquired.wait(5))
+        return thread, release
+
+    def test_readers_share(self):
+        """Test that a shared lock does not block other readers but blocks writers."""
+        thread, release = self.start_holder(shared=True)
+        lock = ReadWriteFileLock(self.path, timeout=0.05)
+        lock.acquire_shared()
+        lock.release()
+        with self.assertRaises(Timeout):
+            lock.acquire()
+        release.set()
+        thread.join()
+        lock.acquire()
+        lock.release()
+
+    def test_writer_excludes_readers(self):
+        """Test that an exclusive lock blocks readers."""
+        thread, release = self.start_holder(shared=False)
+        with self.assertRaises(Timeout):
+            ReadWriteFileLock(self.path, timeout=0.05).acquire_shared()
+        release.set()
+        thread.join()
+
+    def test_reentrancy(self):
+        """Test nested acquisition and refused upgrades."""
+        lock = ReadWriteFileLock(self.path)
+        lock.acquire()
+        lock.acquire_shared()
+        lock.release()
+        self.assertTrue(lock.is_locked)
+        lock.release()
+        self.assertFalse(lock.is_locked)
+        lock.acquire_shared()
+        with self.assertRaises(RuntimeError):
+            lock.acquire()
+        lock.release()
+
+    def test_storage_with_shared_reads(self):
+        """Test that Storage works end to end in shared-read mode."""
+        storage = Storage("test_shared_reads", self.tmp, indexes=["value.owner"], shared_reads=True)
+        self.assertIsInstance(storage.db_lock, ReadWriteFileLock)
+        storage.create("a", {"owner": "x"})
+        storage.create("expired", 1, seconds=-1)
+        self.assertEqual(storage.increment("n", 2), 2)
+        self.assertEqual(storage.read("a"), {"owner": "x"})
+        self.assertIsNone(storage.read("expired"))
+        self.assertEqual(sorted(storage.keys("*")), ["a", "n"])
+        self.assertEqual(storage.find("value.owner", "x"), {"a": {"owner": "x"}})
+        storage.shutdown()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import shutil
+import time
+import unittest
+
+from core.memory import MemoryStorage
+
+
+class TestMemoryStorage(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = 'test_cache'
+        self.storage = MemoryStorage("test_memory_storage", self.cache_path)
+
+    def test_crud(self):
+        """Test the basic Storage API on the memory backend."""
+        self.assertTrue(self.storage.create("key", "value"))
+        self.assertEqual(self.storage.read("key"), "value")
+        self.assertTrue(self.storage.update("key", "new"))
+        self.assertEqual(self.storage.read("key"), "new")
+        self.assertTrue(self.storage.delete("key"))
+        self.assertIsNone(self.storage.read("key"))
+        self.assertFalse(self.storage.update("key", "value"))
+        self.assertFalse(self.storage.delete("key"))
+
+    def test_increment_and_keys(self):
+        """Test counters and key pattern matching."""
+        self.assertEqual(self.storage.increment("hits:a"), 1)
+        self.assertEqual(self.storage.increment("hits:a", 4), 5)
+        self.storage.create("other", 1)
+        self.assertEqual(self.storage.keys("hits:*"), ["hits:a"])
+
+    def test_increment_non_numeric(self):
+        """Test that incrementing a value that is not a number logs, returns the amount and keeps the value."""
+        self.storage.create("doc", {"count": 1})
+        self.assertEqual(self.storage.increment("doc", 2), 2)
+        self.assertEqual(self.storage.read("doc"), {"count": 1})
+
+    def test_expiration(self):
+        """Test that expired entries are hidden and cleaned up."""
+        self.storage.create("session", "token", seconds=0.05)
+        self.storage.create("persistent", "value")
+        time.sleep(0.1)
+        self.assertEqual(self.storage.keys("*"), ["persistent"])
+        self.assertEqual(self.storage.cleanup_expired_entries(), 1)
+        self.assertIsNone(self.storage.read("session"))
+
+    def test_max_entries(self):
+        """Test that the memory cap evicts the oldest entries."""
+        storage = MemoryStorage("test_capped", self.cache_path, max_entries=3)
+        for i in range(5):
+            storage.create(f"key_{i}", i)
+        self.assertEqual(sorted(storage.keys("*")), ["key_2", "key_3", "key_4"])
+
+    def test_indexes(self):
+        """Test secondary indexes on the memory backend."""
+        self.storage.create_index("value.owner")
+        self.storage.create_many({"a": {"owner": "x"}, "b": {"owner": "y"}, "c": {"owner": "x"}})
+        self.storage.delete("c")
+        self.assertEqual(self.storage.find("value.owner", "x"), {"a": {"owner": "x"}})
+
+    def test_values_are_copied(self):
+        """Test that changing a value after writing or reading it does not change the store or its indexes."""
+        self.storage.create_index('owner')
+        value = {'owner': 'alice', 'tags': ['a']}
+        self.storage.create("key", value)
+        value['tags'].append('b')
+        self.storage.read("key")['owner'] = 'bob'
+        self.storage.read_many(["key"])["key"]['tags'].append('c')
+        self.assertEqual(self.storage.read("key"), {'owner': 'alice', 'tags': ['a']})
+        self.assertEqual(self.storage.find('owner', 'alice'), {"key": {'owner': 'alice', 'tags': ['a']}})
+        self.assertEqual(self.storage.find('owner', 'bob'), {})
+
+    def test_rejects_values_storage_cannot_hold(self):
+        """Test that values that are not JSON-serialisable are refused like Storage does."""
+        self.assertFalse(self.storage.create("key", {1, 2}))
+        self.assertFalse(self.storage.create_many({"a": 1, "b": {1}}))
+        self.assertIsNone(self.storage.read("a"))
+        self.storage.create("key", "value")
+        self.assertFalse(self.storage.update("key", {1}))
+        self.assertEqual(self.storage.read("key"), "value")
+
+    def test_snapshot_reload(self):
+        """Test that snapshotted contents are reloaded by a new instance."""
+        storage = MemoryStorage("test_memory_snapshots", self.cache_path, snapshot_interval=3600)
+        storage.create("a", 1)
+        storage.create("b", [1, 2], seconds=3600)
+        storage.shutdown()
+        reloaded = MemoryStorage("test_memory_snapshots", self.cache_path, snapshot_interval=3600)
+        try:
+            self.assertEqual(reloaded.read_many(["a", "b"]), {"a": 1, "b": [1, 2]})
+        finally:
+            reloaded.shutdown()
+            shutil.rmtree(reloaded.snapshots.snapshot_dir)
+
+    def tearDown(self):
+        self.storage.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
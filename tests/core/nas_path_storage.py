@@ -1,8 +1,8 @@
 import unittest
-import os
 from datetime import datetime, timedelta
 
 from core.storage import NASPathStorage
+from tests.helpers import remove_store_files
 
 
 class TestNASPathStorage(unittest.TestCase):
@@ -48,10 +48,7 @@ class TestNASPathStorage(unittest.TestCase):
 
     def tearDown(self):
         self.nas_storage.shutdown()
-        os.remove(self.nas_storage.db_path)
-        lock_path = f"{self.nas_storage.db_path}.lock"
-        if os.path.exists(lock_path):
-            os.remove(lock_path)
+        remove_store_files(self.nas_storage)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,215 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from core.replication import MutationLog, ReplicationClient
+from core.storage import Storage
+from core.stores import KeyValueServer, ReplicaServer
+from tests.helpers import free_port, start_server_process, wait_for
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.05)
+
+
+class TestMutationLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "test.log")
+
+    def test_since_and_reload(self):
+        """Test reading the log tail and restoring it after a restart."""
+        log = MutationLog(self.path)
+        for i in range(5):
+            log.append('create', f"key_{i}", i, None)
+        self.assertEqual([entry['seq'] for entry in log.since(3)], [4, 5])
+        reloaded = MutationLog(self.path)
+        self.assertEqual(reloaded.seq, 5)
+        self.assertEqual(reloaded.since(4)[0]['args'], ['key_4', 4, None])
+
+    def test_retention(self):
+        """Test that only the last entries are retained."""
+        log = MutationLog(self.path, retention=3)
+        for i in range(10):
+            log.append('delete', f"key_{i}")
+        self.assertEqual(log.start, 8)
+        self.assertEqual([entry['seq'] for entry in log.since(0)], [8, 9, 10])
+        self.assertEqual(MutationLog(self.path, retention=3).start, 8)
+
+    def test_reset_forces_resync(self):
+        """Test that a reset moves the log start past every applied entry."""
+        log = MutationLog(self.path)
+        log.append('create', "key", 1, None)
+        log.reset()
+        self.assertEqual(log.since(0), [])
+        self.assertGreater(log.start, log.seq)
+        self.assertEqual(MutationLog(self.path).seq, 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.primary = KeyValueServer("test_replay", os.path.join(self.tmp, "primary"), replicate=True)
+        self.replica = Storage("test_replay", os.path.join(self.tmp, "replica"))
+        self.client = ReplicationClient(self.replica, "PYRO:unused@localhost:1")
+
+    def replay(self, times=1):
+        for _ in range(times):
+            for entry in self.primary.mutation_log.since(0):
+                self.client.apply(entry)
+
+    def test_replay_is_idempotent(self):
+        """Test that replaying entries again, as after a crash before the seq is saved, changes nothing."""
+        self.primary.create("key", "value")
+        self.primary.create("key", "second")
+        self.primary.increment("counter", 2)
+        self.primary.increment("counter", 3)
+        self.primary.create_many({"a": 1, "b": 2})
+        self.primary.delete("a")
+        self.replay(times=2)
+        for key in ("key", "counter", "a", "b"):
+            self.assertEqual(self.replica.read(key), self.primary.read(key))
+        self.assertEqual(sorted(self.replica.keys("*")), sorted(self.primary.keys("*")))
+
+    def test_expiration_is_absolute(self):
+        """Test that replicas keep the primary's expiration time however late they replay."""
+        self.primary.create("session", "token", 60)
+        self.primary.create("other", "value")
+        self.primary.update("other", "new", 1)
+        time.sleep(0.05)
+        self.replay()
+        for key in ("session", "other"):
+            expected = self.primary.kv_storage.records_for([key])[key][0]['expiration']
+            self.assertEqual(self.replica.records_for([key])[key][0]['expiration'], expected)
+
+    def test_snapshot_streams_in_batches(self):
+        """Test that snapshots are streamed batch by batch with the log position."""
+        self.primary.create_many({f"key_{i}": i for i in range(5)})
+        batches = list(self.primary.replication_snapshot(batch_size=2))
+        self.assertEqual([len(batch['records']) for batch in batches], [0, 2, 2, 1])
+        self.assertTrue(all(batch['seq'] == 1 for batch in batches))
+        self.client.install_snapshot(iter(batches))
+        self.assertEqual(self.replica.read("key_4"), 4)
+        self.assertEqual(self.client.applied_seq, 1)
+
+    def tearDown(self):
+        self.primary.shutdown()
+        self.replica.shutdown()
+        shutil.rmtree(self.tmp)
+
+
+class TestReplication(unittest.TestCase):
+    def setUp(self):
+        self.label = "test_replicated"
+        self.primary_dir = tempfile.mkdtemp()
+        self.replica_dir = tempfile.mkdtemp()
+        self.primary_port, self.replica_port = free_port(), free_port()
+        self.primary_uri = f"PYRO:{self.label}@localhost:{self.primary_port}"
+        self.replica_uri = f"PYRO:{self.label}@localhost:{self.replica_port}"
+        self.processes = []
+        self.start_primary()
+
+    def start_primary(self):
+        self.start_process(self.label, port=self.primary_port, cache_path=self.primary_dir, replicate=True)
+        self.primary = wait_for(self.primary_uri)
+
+    def start_replica(self):
+        self.start_process(self.label, plugin=ReplicaServer, port=self.replica_port, cache_path=self.replica_dir,
+                           primary_uri=self.primary_uri, interval=0.05)
+        return wait_for(self.replica_uri)
+
+    def start_process(self, label, **kwargs):
+        self.processes.append(start_server_process(label, **kwargs))
+
+    def test_replica_follows_primary(self):
+        """Test that a replica receives existing data and later writes."""
+        self.primary.create("before", "snapshot")
+        replica = self.start_replica()
+        self.primary.create("after", "log")
+        self.primary.increment("counter", 3)
+        wait_until(lambda: replica.replication_status()['lag_ops'] == 0 and replica.read("counter") == 3)
+        self.assertEqual(replica.read("before"), "snapshot")
+        self.assertEqual(replica.read("after"), "log")
+        self.assertEqual(sorted(replica.keys("*")), ["after", "before", "counter"])
+        status = replica.replication_status()
+        self.assertEqual(status['applied_seq'], status['primary_seq'])
+        self.assertLess(status['lag_seconds'], 5)
+
+    def test_replica_receives_bytes(self):
+        """Test that bytes values replicate as bytes and survive a reload of the log file."""
+        replica = self.start_replica()
+        self.primary.create("blob", b"\x00\x01raw")
+        wait_until(lambda: replica.read("blob") is not None)
+        self.assertEqual(replica.read("blob"), b"\x00\x01raw")
+        self.primary._pyroRelease()
+        self.processes[0].terminate()
+        self.processes[0].join()
+        self.start_primary()
+        self.primary.create("other", b"\x02")
+        wait_until(lambda: replica.read("other") == b"\x02")
+        self.assertEqual(replica.read("blob"), b"\x00\x01raw")
+
+    def test_client_stops_from_another_thread(self):
+        """Test that stopping the replication client from another thread releases its proxy."""
+        self.primary.create("key", "value")
+        storage = Storage(self.label, self.replica_dir)
+        client = ReplicationClient(storage, self.primary_uri, interval=0.05)
+        client.start()
+        wait_until(lambda: storage.read("key") == "value")
+        client.stop()
+        self.assertFalse(client.is_alive())
+        self.assertIsNone(client._proxy)
+        storage.shutdown()
+
+    def test_replica_interval_from_environment(self):
+        """Test that the poll interval is read from the environment when the replica is created."""
+        self.primary.create("key", "value")
+        with patch.dict(os.environ, {'KVSTORE_REPLICA_INTERVAL': '0.05'}):
+            replica = ReplicaServer(self.label, self.replica_dir, self.primary_uri)
+        try:
+            self.assertEqual(replica.replication.interval, 0.05)
+            wait_until(lambda: replica.read("key") == "value")
+        finally:
+            replica.shutdown()
+
+    def test_replica_rejects_writes(self):
+        """Test that writes sent to a replica are refused."""
+        replica = self.start_replica()
+        with self.assertRaises(RuntimeError):
+            replica.create("key", "value")
+
+    def test_replica_catches_up_after_restart(self):
+        """Test that a restarted replica resumes from the log tail."""
+        replica = self.start_replica()
+        self.primary.create("first", 1)
+        wait_until(lambda: replica.read("first") == 1)
+        replica._pyroRelease()
+        self.processes[-1].terminate()
+        self.processes[-1].join()
+        self.primary.create("second", 2)
+        self.primary.delete("first")
+        replica = self.start_replica()
+        wait_until(lambda: replica.read("second") == 2)
+        self.assertIsNone(replica.read("first"))
+
+    def tearDown(self):
+        self.primary._pyroRelease()
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        shutil.rmtree(self.primary_dir)
+        shutil.rmtree(self.replica_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
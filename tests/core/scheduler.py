@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+
+from core.scheduler import MaintenanceScheduler, MaintenanceTask
+
+
+class TestMaintenanceTask(unittest.TestCase):
+    def test_adaptive_interval(self):
+        """Test that the interval shrinks while there is work and recovers when idle."""
+        results = iter([10, 10, 0, 0, 0])
+        task = MaintenanceTask("sweep", lambda: next(results), 8, adaptive=True, min_interval=2)
+        task.run()
+        self.assertEqual(task.current_interval, 4)
+        task.run()
+        self.assertEqual(task.current_interval, 2)
+        for _ in range(3):
+            task.run()
+        self.assertEqual(task.current_interval, 8)
+
+    def test_budget_and_stats(self):
+        """Test that the budget is passed to the task and overruns are counted."""
+        budgets = []
+
+        def sweep(budget):
+            budgets.append(budget)
+            time.sleep(0.02)
+
+        task = MaintenanceTask("sweep", sweep, 1, budget=0.01)
+        task.run()
+        self.assertEqual(budgets, [0.01])
+        self.assertEqual(task.stats['runs'], 1)
+        self.assertEqual(task.stats['over_budget'], 1)
+        self.assertGreater(task.stats['max_time'], 0.01)
+
+    def test_jitter(self):
+        """Test that delays are spread around the interval."""
+        task = MaintenanceTask("sweep", lambda: None, 100, jitter=0.2)
+        delays = {task.next_delay() for _ in range(20)}
+        self.assertGreater(len(delays), 1)
+        self.assertTrue(all(80 <= delay <= 120 for delay in delays))
+
+
+class TestMaintenanceScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = MaintenanceScheduler()
+        self.scheduler.start()
+
+    def test_runs_many_tasks_on_one_thread(self):
+        """Test that tasks for several stores run on the scheduler thread."""
+        threads = {}
+        done = threading.Event()
+
+        def make_task(name):
+            def task():
+                threads.setdefault(name, threading.current_thread())
+                if len(threads) == 3:
+                    done.set()
+            return task
+
+        for name in ("a", "b", "c"):
+            self.scheduler.add(name, make_task(name), 0.05)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(len(set(threads.values())), 1)
+        self.assertIs(threads["a"], self.scheduler.thread)
+        self.assertEqual(set(self.scheduler.stats()), {"a", "b", "c"})
+
+    def test_removed_task_stops_running(self):
+        """Test that removing a task cancels its future runs."""
+        calls = []
+        self.scheduler.add("task", lambda: calls.append(1), 0.01, jitter=0)
+        time.sleep(0.1)
+        self.scheduler.remove("task")
+        count = len(calls)
+        time.sleep(0.1)
+        self.assertGreater(count, 0)
+        self.assertEqual(len(calls), count)
+
+    def test_remove_waits_for_running_task(self):
+        """Test that remove() returns only once a run in progress has finished."""
+        started, finished = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.2)
+            finished.set()
+
+        self.scheduler.add("slow", slow, 0.01, jitter=0)
+        self.assertTrue(started.wait(5))
+        self.scheduler.remove("slow")
+        self.assertTrue(finished.is_set())
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
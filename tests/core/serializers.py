@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.client import available_serializers, connect, from_wire
+from core.storage import Storage
+from tests.helpers import ServerTestCase
+
+
+class TestBytesValues(unittest.TestCase):
+    def test_bytes_round_trip_through_storage(self):
+        """Test that bytes values are stored and returned as bytes."""
+        cache_path = tempfile.mkdtemp()
+        try:
+            storage = Storage("test_bytes", cache_path)
+            storage.create("blob", b"\x00\xffpayload")
+            storage.create_many({"view": memoryview(b"abc"), "dict": {"data": 1}})
+            self.assertEqual(storage.read("blob"), b"\x00\xffpayload")
+            self.assertEqual(storage.read_many(["view", "dict"]), {"view": b"abc", "dict": {"data": 1}})
+            storage.shutdown()
+        finally:
+            shutil.rmtree(cache_path)
+
+    def test_tagged_looking_values_round_trip(self):
+        """Test that user dicts shaped like the bytes tag are stored as dicts."""
+        cache_path = tempfile.mkdtemp()
+        try:
+            storage = Storage("test_tags", cache_path)
+            values = {"tag": {"__bytes__": "x"}, "escape": {"__escaped__": 1}, "both": {"__bytes__": 1, "a": 2}}
+            storage.create_many(values)
+            self.assertEqual(storage.read_many(list(values)), values)
+            storage.shutdown()
+        finally:
+            shutil.rmtree(cache_path)
+
+    def test_from_wire(self):
+        """Test that base64 dicts only become bytes when they came over serpent or json."""
+        encoded = {'data': 'YWJj', 'encoding': 'base64'}
+        self.assertEqual(from_wire(encoded, 'serpent'), b"abc")
+        self.assertEqual(from_wire(encoded, 'msgpack'), encoded)
+        self.assertEqual(from_wire(encoded), encoded)
+        self.assertEqual(from_wire({'data': 'YWJj'}, 'serpent'), {'data': 'YWJj'})
+        self.assertEqual(from_wire({'a': [encoded, 1], 'b': (encoded,)}, 'serpent'), {'a': [b"abc", 1], 'b': (b"abc",)})
+
+
+class TestSerializerNegotiation(ServerTestCase):
+    label = "test_serializers"
+
+    def test_negotiates_best_serializer(self):
+        """Test that a connection picks the most preferred serializer both sides support."""
+        proxy = connect(self.uri)
+        self.assertEqual(proxy._pyroSerializer, available_serializers()[0])
+        proxy._pyroRelease()
+
+    def test_bytes_travel_raw(self):
+        """Test bytes round trips with every serializer, including base64 ones."""
+        for serializer in available_serializers():
+            with self.subTest(serializer=serializer):
+                proxy = connect(self.uri, serializer)
+                self.assertTrue(proxy.create(f"blob_{serializer}", os.urandom(64) + b"end"))
+                value = proxy.read(f"blob_{serializer}")
+                self.assertIsInstance(value, bytes)
+                self.assertTrue(value.endswith(b"end"))
+                self.assertEqual(proxy.read_many([f"blob_{serializer}", "missing"]), {f"blob_{serializer}": value})
+                proxy._pyroRelease()
+
+    def test_nested_bytes_are_rejected_alike(self):
+        """Test that bytes nested in a value are refused whatever serializer sent them."""
+        for serializer in available_serializers():
+            with self.subTest(serializer=serializer):
+                proxy = connect(self.uri, serializer)
+                self.assertFalse(proxy.create(f"nested_{serializer}", {'blob': b"abc"}))
+                self.assertIsNone(proxy.read(f"nested_{serializer}"))
+                proxy._pyroRelease()
+
+    def test_base64_shaped_dicts_are_kept(self):
+        """Test that a dict shaped like serpent's bytes encoding survives binary serializers."""
+        value = {'data': 'YWJj', 'encoding': 'base64'}
+        for serializer in ('msgpack', 'marshal'):
+            with self.subTest(serializer=serializer):
+                proxy = connect(self.uri, serializer)
+                proxy.create(f"shaped_{serializer}", value)
+                self.assertEqual(proxy.read(f"shaped_{serializer}"), value)
+                proxy._pyroRelease()
+
+
+if __name__ == '__main__':
+    unittest.main()
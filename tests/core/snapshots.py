@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import unittest
+from unittest.mock import patch
+
+from filelock import Timeout
+
+from core.snapshots import SnapshotManager
+from core.storage import Storage
+from tests.helpers import remove_store_files
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = 'test_cache'
+        self.storage = Storage("test_snapshots", self.cache_path)
+
+    def test_full_snapshot_and_restore(self):
+        """Test restoring a store to a full snapshot."""
+        self.storage.create("a", 1)
+        self.storage.create("b", {"nested": [1, 2]})
+        snapshot = self.storage.snapshot()
+        self.assertEqual(snapshot['type'], 'full')
+        self.assertEqual(snapshot['records'], 2)
+        self.storage.delete("a")
+        self.storage.update("b", "changed")
+        self.assertTrue(self.storage.restore())
+        self.assertEqual(self.storage.read("a"), 1)
+        self.assertEqual(self.storage.read("b"), {"nested": [1, 2]})
+
+    def test_incremental_snapshots(self):
+        """Test that incremental snapshots only store changes and restore the chain."""
+        for i in range(10):
+            self.storage.create(f"key_{i}", i)
+        base = self.storage.snapshot()
+        self.storage.update("key_1", 100)
+        self.storage.delete("key_2")
+        first = self.storage.snapshot(incremental=True)
+        self.assertEqual(first['type'], 'incr')
+        self.assertEqual(first['changes'], 2)
+        self.storage.create("key_new", "new")
+        second = self.storage.snapshot(incremental=True)
+        self.assertEqual(second['changes'], 1)
+        self.assertEqual([s['id'] for s in self.storage.list_snapshots()], [base['id'], first['id'], second['id']])
+
+        self.storage.create("after", True)
+        self.assertTrue(self.storage.restore(first['id']))
+        self.assertEqual(self.storage.read("key_1"), 100)
+        self.assertIsNone(self.storage.read("key_2"))
+        self.assertIsNone(self.storage.read("key_new"))
+        self.assertIsNone(self.storage.read("after"))
+
+        self.assertTrue(self.storage.restore())
+        self.assertEqual(self.storage.read("key_new"), "new")
+        # Inserts after a restore must not reuse existing document ids
+        self.storage.create("fresh", 1)
+        self.assertEqual(len(self.storage.keys("*")), 11)
+
+    def test_periodic_full_snapshots_and_retention(self):
+        """Test that chains are cut by periodic full snapshots and old chains are deleted."""
+        self.storage._snapshots = SnapshotManager(self.storage.snapshots.snapshot_dir, full_every=2, keep=2)
+        for i in range(7):
+            self.storage.create(f"key_{i}", i)
+            self.storage.snapshot(incremental=True)
+        snapshots = self.storage.list_snapshots()
+        self.assertEqual([s['type'] for s in snapshots], ['full', 'incr', 'incr', 'full'])
+        self.assertEqual(snapshots[0]['id'], '000004')
+        files = sorted(os.listdir(self.storage.snapshots.snapshot_dir))
+        self.assertEqual(files, ['000004.full.json', '000005.incr.json', '000006.incr.json', '000007.full.json',
+                                 'manifest.json'])
+        self.storage.delete("key_0")
+        self.assertTrue(self.storage.restore('000006'))
+        self.assertEqual(self.storage.read("key_5"), 5)
+        self.assertIsNone(self.storage.read("key_6"))
+
+    def test_snapshot_lock_timeout(self):
+        """Test that a lock timeout is logged and reported as an empty result."""
+        with patch.object(self.storage.db_lock, 'acquire', side_effect=Timeout(self.storage.db_path)):
+            self.assertEqual(self.storage.snapshot(), {})
+        self.assertEqual(self.storage.list_snapshots(), [])
+
+    def test_snapshot_files(self):
+        """Test that a full snapshot is a verbatim copy of the database file."""
+        self.storage.create("a", 1)
+        snapshot = self.storage.snapshot()
+        path = os.path.join(self.storage.snapshots.snapshot_dir, f"{snapshot['id']}.full.json")
+        with open(path) as f, open(self.storage.db_path) as db:
+            self.assertEqual(json.load(f), json.load(db))
+
+    def tearDown(self):
+        self.storage.shutdown()
+        remove_store_files(self.storage)
+        shutil.rmtree(self.storage.snapshots.snapshot_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,10 @@
 import time
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 from datetime import datetime, timedelta
-import os
 
 from core.storage import Storage
+from tests.helpers import remove_store_files
 
 
 class TestStorage(unittest.TestCase):
@@ -60,19 +60,45 @@ class TestStorage(unittest.TestCase):
         result = self.storage.read("temp_key")
         self.assertIsNone(result)
 
-    @patch('threading.Thread')
-    def test_periodic_cleanup_thread_starts(self, mock_thread):
-        """Test if the cleanup thread starts correctly."""
+    def test_periodic_cleanup_is_scheduled(self):
+        """Test if the cleanup task is registered with the shared scheduler."""
         self.storage.start_cleanup_thread()
-        mock_thread.assert_called_once()
+        self.assertTrue(self.storage.scheduler.is_alive())
+        self.assertIn(f"{self.storage.db_path}:sweep", self.storage.scheduler.stats())
+        self.storage.shutdown()
+        self.assertNotIn(f"{self.storage.db_path}:sweep", self.storage.scheduler.stats())
+
+    def test_cleanup_respects_budget(self):
+        """Test that a sweep with no budget left removes nothing and leaves entries for later."""
+        self.storage.create_many({f"temp_{i}": i for i in range(5)}, seconds=-1)
+        self.assertEqual(self.storage.cleanup_expired_entries(budget=0), 0)
+        self.assertEqual(self.storage.cleanup_expired_entries(budget=1, batch_size=2), 5)
+
+    def test_cleanup_writes_once(self):
+        """Test that a sweep removes everything it found with a single write."""
+        self.storage.create_many({f"temp_{i}": i for i in range(10)}, seconds=-1)
+        self.storage.create("kept", 1)
+        with patch.object(self.storage.db.storage, 'write', wraps=self.storage.db.storage.write) as write:
+            self.assertEqual(self.storage.cleanup_expired_entries(batch_size=3), 10)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(self.storage.keys("*"), ["kept"])
+
+    def test_cleanup_resumes_after_budget(self):
+        """Test that a scan cut short by the budget continues where it stopped."""
+        self.storage.create_many({f"kept_{i}": i for i in range(4)})
+        self.storage.create_many({f"temp_{i}": i for i in range(2)}, seconds=-1)
+        # Each run reads the clock for its deadline, then before every batch: allow one batch per run
+        clock = iter([0, 0, 10, 0, 0, 10, 0, 0])
+        with patch('core.storage.time.monotonic', side_effect=lambda: next(clock)):
+            self.assertEqual(self.storage.cleanup_expired_entries(budget=5, batch_size=2), 0)
+            self.assertEqual(self.storage.cleanup_expired_entries(budget=5, batch_size=2), 0)
+            self.assertEqual(self.storage.cleanup_expired_entries(budget=5, batch_size=2), 2)
+        self.assertEqual(len(self.storage.keys("*")), 4)
 
     def tearDown(self):
         # Clean up any files or resources if necessary
         self.storage.shutdown()
-        os.remove(self.storage.db_path)
-        lock_path = f"{self.storage.db_path}.lock"
-        if os.path.exists(lock_path):
-            os.remove(lock_path)
+        remove_store_files(self.storage)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+
+import Pyro5.errors
+
+from core.client import connect
+from core.server import start_server
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(uri, timeout=10, serializer=None):
+    """Return a bound proxy once the server at ``uri`` accepts connections."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            proxy = connect(uri, serializer)
+            proxy._pyroBind()
+            return proxy
+        except Pyro5.errors.CommunicationError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def start_server_process(label, **kwargs):
+    """Run start_server for ``label`` in a daemon child process."""
+    process = multiprocessing.Process(target=start_server, args=(label,), kwargs=kwargs, daemon=True)
+    process.start()
+    return process
+
+
+def remove_store_files(storage):
+    """Delete a store's database file and the lock and index checkpoint written next to it."""
+    for path in (storage.db_path, f"{storage.db_path}.lock", f"{storage.db_path}.idx"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ServerTestCase(unittest.TestCase):
+    """Runs one KeyValueServer for ``label`` in a child process for the whole test class."""
+
+    label = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_path = tempfile.mkdtemp()
+        port = free_port()
+        cls.uri = f"PYRO:{cls.label}@localhost:{port}"
+        cls.process = start_server_process(cls.label, port=port, cache_path=cls.cache_path)
+        wait_for(cls.uri, serializer='marshal')._pyroRelease()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.process.terminate()
+        cls.process.join()
+        shutil.rmtree(cls.cache_path)
@@ -1,14 +1,34 @@
 import os
+import hmac
 import base64
-import keyring
+import hashlib
 import logging
 from getpass import getuser
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
 # Set up basic configuration for logging
 logging.basicConfig(level=logging.INFO)
 
+
+NONCE_SIZE = 12
+
+
+def _cipher(key: bytes, iv: bytes):
+    """Build the AES-CFB cipher used by the legacy message API, importing cryptography on first use."""
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+    try:
+        from cryptography.hazmat.decrepit.ciphers.modes import CFB
+    except ImportError:  # cryptography < 43
+        from cryptography.hazmat.primitives.ciphers.modes import CFB
+    return Cipher(algorithms.AES(key), CFB(iv), backend=default_backend())
+
+
+def _aead(key: bytes):
+    """Build an AES-GCM cipher, importing cryptography on first use."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM(key)
+
+
 class CryptoManager:
     SERVICE_NAME = 'SAMPLE'  # Static service name
 
@@ -20,6 +40,7 @@ class CryptoManager:
     @classmethod
     def store_key(cls, username: str, key: bytes):
         """Store the key in the system keyring."""
+        import keyring
         encoded_key = base64.urlsafe_b64encode(key).decode()  # Encode key in a URL-safe base64 format
         try:
             keyring.set_password(cls.SERVICE_NAME, username, encoded_key)
@@ -30,6 +51,7 @@ class CryptoManager:
     @classmethod
     def retrieve_key(cls, username: str) -> bytes:
         """Retrieve the key from the system keyring and decode it."""
+        import keyring
         try:
             encoded_key = keyring.get_password(cls.SERVICE_NAME, username)
             if encoded_key is None:
@@ -42,24 +64,70 @@ class CryptoManager:
             logging.error(f"Failed to retrieve or generate key: {e}")
             raise
 
-    def __init__(self, username=None):
+    def __init__(self, username=None, key: bytes = None):
         self.username = username or getuser()
+        self._key = key
+        self._token_key = None
+        self._gcm = None
+
+    @property
+    def key(self) -> bytes:
+        """Return the encryption key, fetching it from the keyring only once."""
+        if self._key is None:
+            self._key = self.retrieve_key(self.username)
+        return self._key
+
+    @property
+    def gcm(self):
+        if self._gcm is None:
+            self._gcm = _aead(self.key)
+        return self._gcm
+
+    def encrypt_bytes(self, data: bytes, associated_data: bytes = None) -> bytes:
+        """Encrypt and authenticate raw bytes with AES-GCM, prepending the nonce.
+
+        ``associated_data`` is authenticated but not encrypted; the same bytes
+        must be passed to decrypt_bytes.
+        """
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + self.gcm.encrypt(nonce, data, associated_data)
+
+    def decrypt_bytes(self, encrypted: bytes, associated_data: bytes = None) -> bytes:
+        """Decrypt bytes produced by encrypt_bytes. Raises InvalidTag if they or the associated data were altered."""
+        return self.gcm.decrypt(encrypted[:NONCE_SIZE], encrypted[NONCE_SIZE:], associated_data)
+
+    def encrypt_many(self, items: list, associated_data: list = None) -> list:
+        """Encrypt a batch of byte strings with a single cipher, with optional associated data for each."""
+        gcm = self.gcm
+        encrypted = []
+        for data, extra in zip(items, associated_data or [None] * len(items)):
+            nonce = os.urandom(NONCE_SIZE)
+            encrypted.append(nonce + gcm.encrypt(nonce, data, extra))
+        return encrypted
+
+    def decrypt_many(self, items: list, associated_data: list = None) -> list:
+        """Decrypt a batch of byte strings with a single cipher."""
+        gcm = self.gcm
+        return [gcm.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], extra)
+                for data, extra in zip(items, associated_data or [None] * len(items))]
+
+    def token(self, value: str) -> str:
+        """Derive a deterministic HMAC-SHA256 lookup token for a value."""
+        if self._token_key is None:
+            # Use a sub-key so lookup tokens never reveal anything about the cipher key
+            self._token_key = hmac.new(self.key, b'kvbc-lookup-token', hashlib.sha256).digest()
+        return hmac.new(self._token_key, value.encode(), hashlib.sha256).hexdigest()
 
     def encrypt_message(self, message: str) -> bytes:
         """Encrypt a message using AES."""
-        key = self.retrieve_key(self.username)
         iv = os.urandom(16)
-        cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
-        encryptor = cipher.encryptor()
-        encrypted = encryptor.update(message.encode()) + encryptor.finalize()
-        return iv + encrypted  # Prepend IV for use in decryption
+        encryptor = _cipher(self.key, iv).encryptor()
+        return iv + encryptor.update(message.encode()) + encryptor.finalize()  # Prepend IV for use in decryption
 
     def decrypt_message(self, encrypted: bytes) -> str:
         """Decrypt a message using AES."""
-        key = self.retrieve_key(self.username)
         iv, encrypted_msg = encrypted[:16], encrypted[16:]
-        cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
-        decryptor = cipher.decryptor()
+        decryptor = _cipher(self.key, iv).decryptor()
         return (decryptor.update(encrypted_msg) + decryptor.finalize()).decode()
 
 if __name__ == '__main__':
@@ -2,7 +2,6 @@ import os
 import time
 from getpass import getuser
 
-import jsonpickle
 import hashlib
 from functools import wraps
 
@@ -11,6 +10,7 @@ from utils.crypto import CryptoManager
 
 class CacheManager:
     def __init__(self, cache_file):
+        import jsonpickle  # Deferred: only needed once a cache is actually used
         self.cache_file = cache_file
         # Ensure the cache file exists and initialize it if not
         if not os.path.exists(self.cache_file):
@@ -21,6 +21,8 @@ class CacheManager:
         if func is None:
             return lambda f: self.cache_results(f, expire_in_seconds=expire_in_seconds, encrypt=encrypt)
 
+        import jsonpickle
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             args_key = jsonpickle.encode(args)